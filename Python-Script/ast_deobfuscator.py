@@ -15,43 +15,56 @@ AST-First 反混淆引擎
 - 上下文感知区分字段/方法/类
 """
 
+import importlib.util
 import re
+import threading
+import warnings
+from array import array
 from typing import Dict, List, Tuple, Optional, Set
-from dataclasses import dataclass, field
 
-# 尝试导入 tree-sitter
-try:
-    import tree_sitter
-    import tree_sitter_java as tsjava
-    from tree_sitter import Parser, Language
-    TREE_SITTER_AVAILABLE = True
-    JAVA_LANGUAGE = Language(tsjava.language())
-except ImportError:
-    TREE_SITTER_AVAILABLE = False
-    JAVA_LANGUAGE = None
+# 检查 tree-sitter 是否可用（仅查找模块，不导入；语言对象在首次使用时创建）
+TREE_SITTER_AVAILABLE = (
+    importlib.util.find_spec('tree_sitter') is not None
+    and importlib.util.find_spec('tree_sitter_java') is not None
+)
+_JAVA_LANGUAGE = None
 
 
-# ==================== TextEdit 数据结构 ====================
+def _get_java_language():
+    """延迟导入 tree_sitter_java 并创建 Java Language 单例"""
+    global _JAVA_LANGUAGE
+    if _JAVA_LANGUAGE is None:
+        import tree_sitter_java as tsjava
+        from tree_sitter import Language
+        _JAVA_LANGUAGE = Language(tsjava.language())
+    return _JAVA_LANGUAGE
+
 
-@dataclass
-class TextEdit:
-    """单个文本编辑操作"""
-    start_byte: int
-    end_byte: int
-    new_text: str
-    reason: str = ""  # 调试用
+def __getattr__(name):
+    # 兼容旧的模块级 JAVA_LANGUAGE 访问
+    if name == 'JAVA_LANGUAGE':
+        return _get_java_language() if TREE_SITTER_AVAILABLE else None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
+# ==================== TextEdit 数据结构 ====================
+
 class TextEdits:
     """
     文本编辑集合
     
     收集所有编辑操作，按 start_byte 倒序一次性应用，避免位置漂移
+    
+    采用并行数组存储（starts / ends / texts），不为每条编辑分配对象；
+    去重键将 (start, end) 打包为单个整数
     """
     
     def __init__(self):
-        self.edits: List[TextEdit] = []
-        self._positions: Set[Tuple[int, int]] = set()
+        self.starts = array('i')
+        self.ends = array('i')
+        self.texts: List[bytes] = []
+        self.reasons: List[str] = []
+        self._keys: Set[int] = set()
     
     def add(self, start: int, end: int, text: str, reason: str = ""):
         """
@@ -63,16 +76,19 @@ class TextEdits:
             text: 替换文本
             reason: 替换原因（调试用）
         """
-        pos = (start, end)
-        if pos not in self._positions:
-            self._positions.add(pos)
-            self.edits.append(TextEdit(start, end, text, reason))
+        key = (start << 32) | end
+        if key not in self._keys:
+            self._keys.add(key)
+            self.starts.append(start)
+            self.ends.append(end)
+            self.texts.append(text.encode('utf8'))
+            self.reasons.append(reason)
     
     def apply(self, source: bytes) -> str:
         """
         应用所有编辑操作
         
-        按 start_byte 倒序排序后应用，避免位置漂移
+        首尾相接的编辑先合并为一段，再按 start_byte 倒序应用，避免位置漂移
         
         Args:
             source: 原始代码字节
@@ -80,28 +96,39 @@ class TextEdits:
         Returns:
             处理后的代码字符串
         """
-        if not self.edits:
+        if not self.texts:
             return source.decode('utf8')
         
-        # 按 start_byte 倒序排序
-        self.edits.sort(key=lambda e: e.start_byte, reverse=True)
+        # 按 start_byte 升序排序（仅排序下标），合并首尾相接的编辑
+        starts, ends, texts = self.starts, self.ends, self.texts
+        merged: List[list] = []  # [start, end, [texts]]
+        for i in sorted(range(len(texts)), key=starts.__getitem__):
+            if merged and merged[-1][1] == starts[i]:
+                run = merged[-1]
+                run[1] = ends[i]
+                run[2].append(texts[i])
+            else:
+                merged.append([starts[i], ends[i], [texts[i]]])
         
+        # 倒序应用合并后的编辑，减少切片赋值（memmove）次数
         result = bytearray(source)
-        for edit in self.edits:
-            result[edit.start_byte:edit.end_byte] = edit.new_text.encode('utf8')
+        for start, end, parts in reversed(merged):
+            result[start:end] = parts[0] if len(parts) == 1 else b''.join(parts)
         
         return result.decode('utf8')
     
     def __len__(self):
-        return len(self.edits)
+        return len(self.texts)
     
     def debug_dump(self) -> str:
         """调试输出"""
-        lines = [f"Total edits: {len(self.edits)}"]
-        for e in self.edits[:20]:  # 最多显示 20 条
-            lines.append(f"  [{e.start_byte}:{e.end_byte}] -> '{e.new_text}' ({e.reason})")
-        if len(self.edits) > 20:
-            lines.append(f"  ... and {len(self.edits) - 20} more")
+        total = len(self.texts)
+        lines = [f"Total edits: {total}"]
+        for i in range(min(total, 20)):  # 最多显示 20 条
+            lines.append(f"  [{self.starts[i]}:{self.ends[i]}] -> "
+                         f"'{self.texts[i].decode('utf8')}' ({self.reasons[i]})")
+        if total > 20:
+            lines.append(f"  ... and {total - 20} more")
         return '\n'.join(lines)
 
 
@@ -120,11 +147,39 @@ def count_nodes(node, node_type: str = None) -> int:
     return count
 
 
-def get_error_ratio(root_node) -> float:
-    """计算 ERROR 节点比例"""
-    total = count_nodes(root_node)
-    errors = count_nodes(root_node, 'ERROR')
-    return errors / total if total > 0 else 0.0
+def count_error_nodes(root_node, limit: int = None) -> int:
+    """
+    迭代统计 ERROR 节点数量
+    
+    仅下探含错误的子树（叶子 ERROR 节点的 has_error 为假，需同时检查 is_error）；
+    给定 limit 时，计数超过 limit 即提前返回
+    """
+    errors = 0
+    stack = [root_node]
+    while stack:
+        node = stack.pop()
+        if node.type == 'ERROR':
+            errors += 1
+            if limit is not None and errors > limit:
+                break
+        stack.extend(child for child in node.children if child.has_error or child.is_error)
+    return errors
+
+
+def get_error_ratio(root_node, threshold: float = None) -> float:
+    """
+    计算 ERROR 节点比例
+    
+    无错误的树直接通过 has_error 短路返回 0；给定 threshold 时，
+    一旦可判定超出阈值即停止遍历（此时返回值为比例下界）
+    """
+    if not root_node.has_error:
+        return 0.0
+    total = root_node.descendant_count
+    if total <= 0:
+        return 0.0
+    limit = int(total * threshold) if threshold is not None else None
+    return count_error_nodes(root_node, limit) / total
 
 
 # ==================== AST 反混淆引擎 ====================
@@ -139,6 +194,9 @@ class ASTDeobfuscator:
     # 错误节点阈值：超过此比例则回退到正则处理
     ERROR_THRESHOLD = 0.1
     
+    # 单次解析超时（微秒）
+    PARSE_TIMEOUT_MICROS = 5_000_000
+    
     def __init__(self, class_map: Dict[str, str], member_map: Dict[str, List[dict]], 
                  type_index=None):
         """
@@ -168,11 +226,35 @@ class ASTDeobfuscator:
             if len(candidates) == 1:
                 self.short_class_map[short] = candidates[0][1]
         
-        # 初始化解析器
-        if TREE_SITTER_AVAILABLE:
-            self.parser = Parser(JAVA_LANGUAGE)
-        else:
-            self.parser = None
+        # bytes 键镜像：直接用源码字节切片查找，避免逐个标识符 UTF-8 解码
+        self._short_class_map_b: Dict[bytes, str] = {
+            k.encode('utf8'): v for k, v in self.short_class_map.items()
+        }
+        self._class_map_b: Dict[bytes, str] = {
+            k.encode('utf8'): v for k, v in class_map.items()
+        }
+        
+        # 解析器按线程缓存，跨 process() 调用复用
+        self._tls = threading.local()
+    
+    @property
+    def parser(self):
+        """当前线程的解析器（Tree-sitter 不可用时为 None）"""
+        return self._get_parser() if TREE_SITTER_AVAILABLE else None
+    
+    def _get_parser(self):
+        """获取（必要时创建）当前线程的解析器"""
+        parser = getattr(self._tls, 'parser', None)
+        if parser is None:
+            from tree_sitter import Parser
+            parser = Parser(_get_java_language())
+            # 病态输入超时即放弃，交由正则流程回退
+            # tree-sitter 0.25 标记 timeout_micros 为弃用，但 bytes 输入下 progress_callback 不生效
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                parser.timeout_micros = self.PARSE_TIMEOUT_MICROS
+            self._tls.parser = parser
+        return parser
     
     def process(self, code: str, current_class: str) -> str:
         """
@@ -186,17 +268,23 @@ class ASTDeobfuscator:
             反混淆后的代码
             
         Raises:
-            ASTParseError: AST 解析错误过多时抛出
+            ASTParseError: AST 解析错误过多或解析超时时抛出
         """
-        if not self.parser:
+        if not TREE_SITTER_AVAILABLE:
             raise ASTParseError("Tree-sitter not available")
         
         # 1. 解析 AST
         code_bytes = code.encode('utf8')
-        tree = self.parser.parse(code_bytes)
-        
-        # 2. 检查错误比例
-        error_ratio = get_error_ratio(tree.root_node)
+        parser = self._get_parser()
+        try:
+            tree = parser.parse(code_bytes)
+        except ValueError:
+            # 超时中止后解析器会保留未完成的文档状态，下次 parse() 会接着它继续，必须先重置
+            parser.reset()
+            raise ASTParseError("Parse timeout")
+        
+        # 2. 检查错误比例（无错误时 has_error 短路，不遍历节点）
+        error_ratio = get_error_ratio(tree.root_node, self.ERROR_THRESHOLD)
         if error_ratio > self.ERROR_THRESHOLD:
             raise ASTParseError(f"Too many errors: {error_ratio:.1%}")
         
@@ -448,13 +536,13 @@ class ASTDeobfuscator:
         # superclass 节点的子节点是类型节点
         for child in node.children:
             if child.type == 'type_identifier':
-                type_name = self._node_text(child, code_bytes)
-                if type_name in self.short_class_map:
+                orig_name = self._short_class_map_b.get(code_bytes[child.start_byte:child.end_byte])
+                if orig_name is not None:
                     edits.add(
                         child.start_byte,
                         child.end_byte,
-                        self.short_class_map[type_name],
-                        f"extends: {type_name} -> {self.short_class_map[type_name]}"
+                        orig_name,
+                        f"extends: {self._node_text(child, code_bytes)} -> {orig_name}"
                     )
             elif child.type == 'scoped_type_identifier':
                 self._handle_scoped_type_identifier(child, code_bytes, edits)
@@ -464,13 +552,13 @@ class ASTDeobfuscator:
         # 遍历所有类型节点
         for child in node.children:
             if child.type == 'type_identifier':
-                type_name = self._node_text(child, code_bytes)
-                if type_name in self.short_class_map:
+                orig_name = self._short_class_map_b.get(code_bytes[child.start_byte:child.end_byte])
+                if orig_name is not None:
                     edits.add(
                         child.start_byte,
                         child.end_byte,
-                        self.short_class_map[type_name],
-                        f"implements: {type_name} -> {self.short_class_map[type_name]}"
+                        orig_name,
+                        f"implements: {self._node_text(child, code_bytes)} -> {orig_name}"
                     )
             elif child.type in ('scoped_type_identifier', 'type_list'):
                 if child.type == 'type_list':
@@ -484,16 +572,14 @@ class ASTDeobfuscator:
         
         在 Tree-sitter 中，全限定类名表示为嵌套的 scoped_type_identifier
         """
-        full_type = self._node_text(node, code_bytes)
-        
         # 在完整类映射中查找
-        if full_type in self.class_map:
-            new_type = self.class_map[full_type]
+        new_type = self._class_map_b.get(code_bytes[node.start_byte:node.end_byte])
+        if new_type is not None:
             edits.add(
                 node.start_byte,
                 node.end_byte,
                 new_type,
-                f"scoped type: {full_type} -> {new_type}"
+                f"scoped type: {self._node_text(node, code_bytes)} -> {new_type}"
             )
             return
         
@@ -501,20 +587,18 @@ class ASTDeobfuscator:
         # scoped_type_identifier 的最后一个子节点通常是 type_identifier
         for child in reversed(node.children):
             if child.type == 'type_identifier':
-                type_name = self._node_text(child, code_bytes)
-                if type_name in self.short_class_map:
+                orig_name = self._short_class_map_b.get(code_bytes[child.start_byte:child.end_byte])
+                if orig_name is not None:
                     edits.add(
                         child.start_byte,
                         child.end_byte,
-                        self.short_class_map[type_name],
-                        f"scoped type suffix: {type_name} -> {self.short_class_map[type_name]}"
+                        orig_name,
+                        f"scoped type suffix: {self._node_text(child, code_bytes)} -> {orig_name}"
                     )
                 break
     
     def _handle_type_identifier(self, node, code_bytes: bytes, edits: TextEdits):
         """处理类型标识符（短类名）"""
-        type_name = self._node_text(node, code_bytes)
-        
         # 跳过已经处理过的全限定名部分
         parent = node.parent
         if parent and parent.type == 'scoped_type_identifier':
@@ -524,14 +608,14 @@ class ASTDeobfuscator:
         if parent and parent.type in ('class_declaration', 'interface_declaration', 'enum_declaration'):
             return
         
-        # 在短类名映射中查找
-        if type_name in self.short_class_map:
-            orig_name = self.short_class_map[type_name]
+        # 在短类名映射中查找（bytes 比较，仅在命中时解码）
+        orig_name = self._short_class_map_b.get(code_bytes[node.start_byte:node.end_byte])
+        if orig_name is not None:
             edits.add(
                 node.start_byte,
                 node.end_byte,
                 orig_name,
-                f"type: {type_name} -> {orig_name}"
+                f"type: {self._node_text(node, code_bytes)} -> {orig_name}"
             )
     
     def _handle_string_literal(self, node, code_bytes: bytes, edits: TextEdits):
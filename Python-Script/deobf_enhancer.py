@@ -12,6 +12,22 @@ import re
 from typing import Dict, List, Set, Tuple, Optional
 from collections import Counter, defaultdict
 
+class _lazy_class_attr:
+    """
+    延迟求值的类属性：首次访问时计算，并以结果替换自身
+    
+    用于编译开销较大的类级正则，导入模块但未使用时不产生编译开销
+    """
+    
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+    
+    def __get__(self, obj, owner):
+        value = self.func(owner)
+        setattr(owner, self.name, value)
+        return value
+
 
 # ==================== 类型到名称的映射 ====================
 
@@ -54,29 +70,49 @@ CONTEXT_PATTERNS = {
 
 # ==================== 动态类型命名表构建 ====================
 
+# 类型命名表缓存 {(id(class_map), len(class_map)): (class_map, hints)}
+# 同时保留 class_map 引用，避免对象回收后 id 被复用导致误命中
+_TYPE_HINTS_CACHE: Dict[Tuple[int, int], Tuple[Dict[str, str], Dict[str, str]]] = {}
+_TYPE_HINTS_CACHE_SIZE = 4
+
+
 def build_type_hints_from_class_map(class_map: Dict[str, str]) -> Dict[str, str]:
     """
     从类映射表动态构建类型命名表
     
+    同一 class_map 对象（且大小未变）只构建一次，返回结果应视为只读
+    
     Args:
         class_map: {obf_class: orig_class}
         
     Returns:
         扩展的类型命名表 {TypeName: varName}
     """
+    key = (id(class_map), len(class_map))
+    cached = _TYPE_HINTS_CACHE.get(key)
+    if cached is not None and cached[0] is class_map:
+        return cached[1]
+    
+    hints = _build_type_hints(class_map)
+    
+    if len(_TYPE_HINTS_CACHE) >= _TYPE_HINTS_CACHE_SIZE:
+        _TYPE_HINTS_CACHE.pop(next(iter(_TYPE_HINTS_CACHE)))
+    _TYPE_HINTS_CACHE[key] = (class_map, hints)
+    return hints
+
+
+def _build_type_hints(class_map: Dict[str, str]) -> Dict[str, str]:
+    """构建类型命名表（无缓存）"""
     hints = dict(TYPE_NAME_HINTS)  # 保留基础表
     
-    for orig_full in class_map.values():
-        short_name = orig_full.split('.')[-1]
-        # 跳过内部类和已存在的映射
-        if not short_name or '$' in short_name or short_name in hints:
-            continue
-        # 转为小驼峰
-        if len(short_name) > 1:
-            var_name = short_name[0].lower() + short_name[1:]
-        else:
-            var_name = short_name.lower()
-        hints[short_name] = var_name
+    # 取短类名（rpartition 不分配列表），跳过内部类和基础表已有的映射
+    short_names = [full.rpartition('.')[2] for full in class_map.values()]
+    # 转为小驼峰（基础表中的名称不覆盖）
+    hints.update({
+        s: s[0].lower() + s[1:] if len(s) > 1 else s.lower()
+        for s in short_names
+        if s and '$' not in s and s not in TYPE_NAME_HINTS
+    })
     
     return hints
 
@@ -88,6 +124,8 @@ class HeuristicNamer:
     启发式变量命名器
     """
     
+    __slots__ = ('type_hints', 'type_counters', 'loop_depth', 'used_names')
+    
     def __init__(self, type_hints: Dict[str, str] = None):
         self.type_hints = type_hints if type_hints else TYPE_NAME_HINTS
         self.type_counters: Dict[str, int] = defaultdict(int)
@@ -108,9 +146,16 @@ class HeuristicNamer:
             var_type: 变量类型
             context: 上下文信息（如 'loop', 'catch'）
         """
-        # 处理泛型
-        base_type = re.sub(r'<.*>', '', var_type).strip()
-        base_type = re.sub(r'\[\]', '', base_type).strip()
+        # 处理泛型（去除首个 '<' 到最后一个 '>'）与数组后缀；绝大多数类型两者皆无，用 str 方法快速判断
+        base_type = var_type
+        if '<' in base_type:
+            lt = base_type.index('<')
+            gt = base_type.rfind('>')
+            if gt > lt:
+                base_type = base_type[:lt] + base_type[gt + 1:]
+        base_type = base_type.strip()
+        if '[' in base_type:
+            base_type = base_type.replace('[]', '').strip()
         
         # 特殊上下文
         if context == 'loop':
@@ -159,78 +204,80 @@ class PatternRecognizer:
     代码模式识别器
     """
     
-    # 模式正则
-    PATTERNS = {
+    # 模式源（类级常量：(名称, 正则源) 元组，按固定顺序迭代）
+    # 捕获组统一以模式名为前缀命名，便于合并为单个交替正则
+    PATTERN_SOURCES: Tuple[Tuple[str, str], ...] = (
         # for 循环
-        'for_loop': re.compile(
-            r'for\s*\(\s*(?:int|long)\s+(\w+)\s*=\s*\d+\s*;',
-            re.MULTILINE
-        ),
+        ('for_loop',
+         r'for\s*\(\s*(?:int|long)\s+(?P<for_loop_var>\w+)\s*=\s*\d+\s*;'),
         
         # foreach 循环
-        'foreach': re.compile(
-            r'for\s*\(\s*(\w+(?:<[^>]+>)?)\s+(\w+)\s*:\s*(\w+)',
-            re.MULTILINE
-        ),
+        ('foreach',
+         r'for\s*\(\s*(?P<foreach_type>\w+(?:<[^>]+>)?)\s+(?P<foreach_var>\w+)\s*:\s*(?P<foreach_iter>\w+)'),
         
         # null 检查
-        'null_check': re.compile(
-            r'if\s*\(\s*(\w+)\s*[!=]=\s*null\s*\)',
-            re.MULTILINE
-        ),
+        ('null_check',
+         r'if\s*\(\s*(?P<null_check_var>\w+)\s*[!=]=\s*null\s*\)'),
         
         # getter 模式
-        'getter': re.compile(
-            r'(?:public|protected|private)?\s*(\w+)\s+get(\w+)\s*\(\s*\)',
-            re.MULTILINE
-        ),
+        ('getter',
+         r'(?:public|protected|private)?\s*(?P<getter_type>\w+)\s+get(?P<getter_name>\w+)\s*\(\s*\)'),
         
         # setter 模式
-        'setter': re.compile(
-            r'(?:public|protected|private)?\s*void\s+set(\w+)\s*\(\s*(\w+)\s+(\w+)\s*\)',
-            re.MULTILINE
-        ),
+        ('setter',
+         r'(?:public|protected|private)?\s*void\s+set(?P<setter_name>\w+)\s*\(\s*(?P<setter_param_type>\w+)\s+(?P<setter_param>\w+)\s*\)'),
         
         # 常量模式
-        'constant': re.compile(
-            r'(?:public|private|protected)?\s*static\s+final\s+(\w+)\s+(\w+)\s*=',
-            re.MULTILINE
-        ),
+        ('constant',
+         r'(?:public|private|protected)?\s*static\s+final\s+(?P<constant_type>\w+)\s+(?P<constant_name>\w+)\s*='),
         
         # 事件处理器
-        'event_handler': re.compile(
-            r'(?:public|protected|private)?\s*void\s+on(\w+)\s*\(',
-            re.MULTILINE
-        ),
+        ('event_handler',
+         r'(?:public|protected|private)?\s*void\s+on(?P<event_handler_name>\w+)\s*\('),
         
         # try-catch
-        'try_catch': re.compile(
-            r'catch\s*\(\s*(\w+(?:\s*\|\s*\w+)*)\s+(\w+)\s*\)',
-            re.MULTILINE
-        ),
+        ('try_catch',
+         r'catch\s*\(\s*(?P<try_catch_type>\w+(?:\s*\|\s*\w+)*)\s+(?P<try_catch_var>\w+)\s*\)'),
         
         # 局部变量声明: Type varName = ... 或 Type varName;
-        'local_var_decl': re.compile(
-            r'\b([A-Z][a-zA-Z0-9_]*)\s+([a-z][a-zA-Z0-9]?)\s*[=;]',
-            re.MULTILINE
-        ),
-    }
-    
-    def analyze(self, code: str) -> Dict[str, List[dict]]:
-        """分析代码中的模式"""
-        results = {}
+        ('local_var_decl',
+         r'\b(?P<local_var_type>[A-Z][a-zA-Z0-9_]*)\s+(?P<local_var_name>[a-z][a-zA-Z0-9]?)\s*[=;]'),
+    )
+    
+    # 以下编译结果均在首次访问时生成并缓存在类上
+    
+    @_lazy_class_attr
+    def PATTERNS(cls) -> Tuple[Tuple[str, 're.Pattern'], ...]:
+        """单独编译的模式（按名称索引，用于只需某一模式的场景）"""
+        return tuple((name, re.compile(src)) for name, src in cls.PATTERN_SOURCES)
+    
+    @_lazy_class_attr
+    def PATTERN_MAP(cls) -> Dict[str, 're.Pattern']:
+        return dict(cls.PATTERNS)
+    
+    @_lazy_class_attr
+    def COMBINED(cls) -> 're.Pattern':
+        """合并后的交替正则：一次扫描源码，通过 lastgroup 区分命中的模式"""
+        return re.compile('|'.join(f'(?P<{name}>{src})' for name, src in cls.PATTERN_SOURCES))
+    
+    def analyze(self, code: str) -> Dict[str, List['re.Match']]:
+        """
+        分析代码中的模式（单次扫描）
+        
+        各模式的匹配互不重叠：同一段文本只归属于最先命中的模式
+        
+        Returns:
+            {模式名: [re.Match, ...]}，仅包含有匹配的模式；
+            捕获组通过带模式名前缀的组名读取（如 match.group('for_loop_var')）
+        """
+        results: Dict[str, List['re.Match']] = {}
         
-        for name, pattern in self.PATTERNS.items():
-            matches = []
-            for match in pattern.finditer(code):
-                matches.append({
-                    'groups': match.groups(),
-                    'start': match.start(),
-                    'end': match.end(),
-                    'text': match.group(0)
-                })
-            if matches:
-                results[name] = matches
+        for match in self.COMBINED.finditer(code):
+            name = match.lastgroup
+            if name in results:
+                results[name].append(match)
+            else:
+                results[name] = [match]
         
         return results
     
@@ -239,13 +286,13 @@ class PatternRecognizer:
         fields = {}
         
         # 从 getter 推断
-        for match in self.PATTERNS['getter'].finditer(code):
+        for match in self.PATTERN_MAP['getter'].finditer(code):
             ret_type, name = match.groups()
             field_name = name[0].lower() + name[1:] if len(name) > 1 else name.lower()
             fields[field_name] = ret_type
         
         # 从 setter 推断
-        for match in self.PATTERNS['setter'].finditer(code):
+        for match in self.PATTERN_MAP['setter'].finditer(code):
             name, param_type, param_name = match.groups()
             field_name = name[0].lower() + name[1:] if len(name) > 1 else name.lower()
             if field_name not in fields:
@@ -254,6 +301,10 @@ class PatternRecognizer:
         return fields
 
 
+# 模块级共享实例：识别器无实例状态，可在各调用方之间复用
+_RECOGNIZER = PatternRecognizer()
+
+
 # ==================== 未映射成员收集器 ====================
 
 class UnmappedCollector:
@@ -261,13 +312,20 @@ class UnmappedCollector:
     未映射成员收集器
     """
     
+    __slots__ = ('unmapped', '_by_type', '_total')
+    
     def __init__(self):
         # (class, type, member) -> count
         self.unmapped: Counter = Counter()
+        # 增量聚合: type -> count，使 analyze() 与条目数无关
+        self._by_type: Counter = Counter()
+        self._total = 0
     
     def add(self, cls: str, member_type: str, member: str):
         """添加未映射成员"""
         self.unmapped[(cls, member_type, member)] += 1
+        self._by_type[member_type] += 1
+        self._total += 1
     
     def get_top(self, n: int = 100) -> List[Tuple[Tuple[str, str, str], int]]:
         """获取出现次数最多的未映射成员"""
@@ -278,22 +336,17 @@ class UnmappedCollector:
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write("# 未映射成员统计\n")
             f.write("# 格式: class, type, member, count\n\n")
-            for (cls, mtype, member), count in self.unmapped.most_common():
-                f.write(f"{cls}, {mtype}, {member}, {count}\n")
+            f.writelines(
+                f"{cls}, {mtype}, {member}, {count}\n"
+                for (cls, mtype, member), count in self.unmapped.most_common()
+            )
     
     def analyze(self) -> Dict[str, any]:
         """分析统计"""
-        total = sum(self.unmapped.values())
-        unique = len(self.unmapped)
-        
-        by_type = defaultdict(int)
-        for (cls, mtype, member), count in self.unmapped.items():
-            by_type[mtype] += count
-        
         return {
-            'total_occurrences': total,
-            'unique_members': unique,
-            'by_type': dict(by_type),
+            'total_occurrences': self._total,
+            'unique_members': len(self.unmapped),
+            'by_type': dict(self._by_type),
         }
 
 
@@ -304,6 +357,8 @@ class MappingExtender:
     映射表扩展器
     """
     
+    __slots__ = ('class_map', 'member_map', 'extended_mappings')
+    
     def __init__(self, class_map: Dict[str, str], member_map: Dict[str, List[dict]]):
         self.class_map = class_map
         self.member_map = member_map
@@ -311,23 +366,21 @@ class MappingExtender:
     
     def extend_from_patterns(self, code: str, obf_class: str):
         """从代码模式扩展映射"""
-        recognizer = PatternRecognizer()
-        patterns = recognizer.analyze(code)
+        # 仅对已有成员映射的类扩展
+        if obf_class not in self.member_map:
+            return
         
         # 从 getter/setter 推断字段
-        fields = recognizer.infer_field_from_getter_setter(code)
-        for field_name, field_type in fields.items():
+        fields = _RECOGNIZER.infer_field_from_getter_setter(code)
+        
+        # 已有映射的字段原名，一次构建后按集合查找
+        orig_field_names = {m['orig'] for m in self.member_map[obf_class] if not m['is_method']}
+        for field_name in fields:
             if len(field_name) <= 2:  # 可能是混淆名
                 continue
-            # 查找对应的混淆字段
-            if obf_class in self.member_map:
-                for m in self.member_map[obf_class]:
-                    if not m['is_method'] and m['orig'] == field_name:
-                        # 已有映射
-                        break
-                else:
-                    # 可能是新发现的字段
-                    self.extended_mappings[obf_class][field_name] = field_name
+            if field_name not in orig_field_names:
+                # 可能是新发现的字段
+                self.extended_mappings[obf_class][field_name] = field_name
     
     def get_extended(self) -> Dict[str, Dict[str, str]]:
         """获取扩展的映射"""
@@ -336,18 +389,47 @@ class MappingExtender:
 
 # ==================== 代码增强器 ====================
 
+# 标识符词法单元：\w+ 的最长匹配等价于 \b...\b 边界内的完整单词
+_IDENT_TOKEN = re.compile(r'\w+')
+
+# 重命名数超过该值时改用逐词法单元查表，交替正则的分支数随之增长而变慢
+_ALTERNATION_MAX_NAMES = 64
+
+
+def rewrite_identifiers(code: str, rename_map: Dict[str, str]) -> str:
+    """
+    单次扫描将 code 中的独立标识符按 rename_map 重命名
+    
+    名称较少时使用交替正则（仅在候选处回调）；
+    名称较多时对每个词法单元查表，开销与名称数无关
+    """
+    if not rename_map:
+        return code
+    
+    if len(rename_map) > _ALTERNATION_MAX_NAMES:
+        get = rename_map.get
+        return _IDENT_TOKEN.sub(lambda m: get(m.group(0), m.group(0)), code)
+    
+    # 只替换独立的标识符，长名称优先
+    names = sorted(rename_map, key=len, reverse=True)
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, names)) + r')\b')
+    return pattern.sub(lambda m: rename_map[m.group(0)], code)
+
+
 class CodeEnhancer:
     """
     代码增强器 - 应用启发式命名
     """
     
+    __slots__ = ('class_map', 'member_map', 'type_hints', 'namer', 'recognizer', 'collector')
+    
     def __init__(self, class_map: Dict[str, str], member_map: Dict[str, List[dict]]):
         self.class_map = class_map
         self.member_map = member_map
         # 构建扩展的类型命名表
         self.type_hints = build_type_hints_from_class_map(class_map)
         self.namer = HeuristicNamer(self.type_hints)
-        self.recognizer = PatternRecognizer()
+        self.recognizer = _RECOGNIZER
         self.collector = UnmappedCollector()
     
     def enhance(self, code: str, obf_class: str) -> str:
@@ -357,41 +439,42 @@ class CodeEnhancer:
         # 分析模式
         patterns = self.recognizer.analyze(code)
         
-        # 收集需要替换的变量
-        replacements = []
+        # 收集需要替换的变量: 旧名 -> 新名
+        # 同名变量以首次推断结果为准；已替换出的新名称不会被再次替换
+        rename_map: Dict[str, str] = {}
         
         # 处理 for 循环变量
+        # 先做廉价的名称过滤，未通过时不再调用 infer_name；推断结果与原名相同时不加入替换
         for match in patterns.get('for_loop', []):
-            var_name = match['groups'][0]
-            if len(var_name) <= 2 and var_name.islower():
-                new_name = self.namer.infer_name('int', 'loop')
-                if new_name != var_name:
-                    replacements.append((var_name, new_name, match['start'], match['end']))
+            var_name = match.group('for_loop_var')
+            if len(var_name) > 2 or not var_name.islower():
+                continue
+            new_name = self.namer.infer_name('int', 'loop')
+            if new_name != var_name:
+                rename_map.setdefault(var_name, new_name)
         
         # 处理 catch 变量
         for match in patterns.get('try_catch', []):
-            exc_type, var_name = match['groups']
-            if len(var_name) <= 2 and var_name.islower():
-                new_name = self.namer.infer_name(exc_type, 'catch')
-                if new_name != var_name:
-                    replacements.append((var_name, new_name, match['start'], match['end']))
+            exc_type, var_name = match.group('try_catch_type', 'try_catch_var')
+            if len(var_name) > 2 or not var_name.islower():
+                continue
+            new_name = self.namer.infer_name(exc_type, 'catch')
+            if new_name != var_name:
+                rename_map.setdefault(var_name, new_name)
         
         # 处理局部变量声明 (NEW)
+        type_hints = self.type_hints
         for match in patterns.get('local_var_decl', []):
-            var_type, var_name = match['groups']
+            var_type, var_name = match.group('local_var_type', 'local_var_name')
             # 仅处理短变量名（1-2字符）且类型在类型表中
-            if len(var_name) <= 2 and var_name.islower() and var_type in self.type_hints:
-                new_name = self.namer.infer_name(var_type)
-                if new_name != var_name and new_name not in self.namer.used_names:
-                    replacements.append((var_name, new_name, match['start'], match['end']))
-        
-        # 应用替换（简化版，使用全局替换）
-        for old_name, new_name, start, end in replacements:
-            # 只替换独立的标识符
-            pattern = r'\b' + re.escape(old_name) + r'\b'
-            code = re.sub(pattern, new_name, code)
+            if not var_name.islower() or var_type not in type_hints:
+                continue
+            new_name = self.namer.infer_name(var_type)
+            if new_name != var_name and new_name not in self.namer.used_names:
+                rename_map.setdefault(var_name, new_name)
         
-        return code
+        # 应用替换：一次扫描，由回调按 rename_map 完成全部替换
+        return rewrite_identifiers(code, rename_map)
     
     def get_unmapped_stats(self) -> Dict:
         """获取未映射统计"""
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+JVM 描述符解析模块
+
+将 JVM 类型描述符 / 方法描述符解析为 Java 类型名，供 smali 解析与方法推断使用。
+
+本模块只依赖标准库且全部带类型注解，可直接用 mypyc 编译为扩展模块:
+    mypyc jvm_descriptor.py
+编译产物 (jvm_descriptor.*.so / .pyd) 与本文件同目录时，import 会优先加载编译版本，
+未编译时使用纯 Python 实现，调用方无需改动。
+"""
+
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+
+# ==================== JVM 类型解析 ====================
+
+JVM_TYPE_MAP: Dict[str, str] = {
+    'V': 'void', 'Z': 'boolean', 'B': 'byte', 'C': 'char',
+    'S': 'short', 'I': 'int', 'J': 'long', 'F': 'float', 'D': 'double'
+}
+
+# 参数列表中的单个类型描述符（可带数组前缀）
+JVM_TYPE_TOKEN = re.compile(r'\[*(?:[VZBCSIJFD]|L[^;]*;)')
+
+
+@lru_cache(maxsize=8192)
+def parse_jvm_type(desc: str) -> Tuple[str, bool]:
+    """
+    解析 JVM 类型描述符为 Java 类型
+    
+    Returns:
+        (类型名, 是否解析成功)
+    """
+    if not desc:
+        return 'void', True
+    
+    # 基本类型
+    if desc in JVM_TYPE_MAP:
+        return JVM_TYPE_MAP[desc], True
+    
+    # 数组类型
+    if desc.startswith('['):
+        element_type, success = parse_jvm_type(desc[1:])
+        if not success:
+            return f'<invalid_array:{desc}>', False
+        return element_type + '[]', True
+    
+    # 对象类型 L...;
+    if desc.startswith('L') and desc.endswith(';'):
+        full_name = desc[1:-1].replace('/', '.')
+        # 处理无包名的类 (如 La;)
+        if '.' not in full_name:
+            return full_name, True
+        return full_name.split('.')[-1], True
+    
+    # 非法描述符
+    return f'<invalid:{desc}>', False
+
+
+def parse_method_descriptor(descriptor: str) -> Tuple[List[str], str, bool]:
+    """
+    解析方法描述符
+    
+    同一描述符（如 (I)V、(Ljava/lang/String;)V）在各类中大量重复，解析结果按描述符缓存
+    
+    Returns:
+        (参数类型列表, 返回类型, 是否解析成功)
+    """
+    params, return_type, parse_success = _parse_method_descriptor_cached(descriptor)
+    
+    # 日志警告：非法描述符可能由混淆器故意插入（缺少括号的描述符直接判为失败，不告警）
+    if not parse_success and descriptor and descriptor.startswith('(') and ')' in descriptor:
+        print(f"Warning: Failed to parse method descriptor: {descriptor}", file=sys.stderr)
+    
+    # 缓存中保存元组，每次返回新列表，调用方修改不会影响缓存
+    return list(params), return_type, parse_success
+
+
+@lru_cache(maxsize=8192)
+def _parse_method_descriptor_cached(descriptor: str) -> Tuple[Tuple[str, ...], str, bool]:
+    """parse_method_descriptor 的缓存实现，参数类型以元组返回"""
+    if not descriptor or not descriptor.startswith('('):
+        return (), 'void', False
+    
+    try:
+        paren_end = descriptor.index(')')
+    except ValueError:
+        return (), '<invalid_descriptor>', False
+    
+    params_part = descriptor[1:paren_end]
+    return_part = descriptor[paren_end + 1:]
+    
+    # 快速路径：正则一次切分全部参数类型；切分结果能完整覆盖参数串即为合法描述符
+    tokens = JVM_TYPE_TOKEN.findall(params_part)
+    if sum(map(len, tokens)) == len(params_part):
+        return_type, ret_success = parse_jvm_type(return_part)
+        return tuple(parse_jvm_type(t)[0] for t in tokens), return_type, ret_success
+    
+    # 非法描述符：逐字符解析，给出具体的错误位置信息
+    params: List[str] = []
+    i = 0
+    parse_success = True
+    
+    while i < len(params_part):
+        char = params_part[i]
+        
+        if char in JVM_TYPE_MAP:
+            params.append(JVM_TYPE_MAP[char])
+            i += 1
+        elif char == 'L':
+            try:
+                end = params_part.index(';', i)
+                type_name, success = parse_jvm_type(params_part[i:end + 1])
+                if not success:
+                    parse_success = False
+                params.append(type_name)
+                i = end + 1
+            except ValueError:
+                # 找不到分号，描述符非法
+                params.append(f'<truncated:{params_part[i:]}>')
+                parse_success = False
+                break
+        elif char == '[':
+            # 数组类型
+            array_depth = 0
+            while i < len(params_part) and params_part[i] == '[':
+                array_depth += 1
+                i += 1
+            if i >= len(params_part):
+                params.append('<incomplete_array>')
+                parse_success = False
+                break
+            
+            if params_part[i] == 'L':
+                try:
+                    end = params_part.index(';', i)
+                    base_type, success = parse_jvm_type(params_part[i:end + 1])
+                    if not success:
+                        parse_success = False
+                    i = end + 1
+                except ValueError:
+                    base_type = f'<truncated:{params_part[i:]}>'
+                    parse_success = False
+                    break
+            elif params_part[i] in JVM_TYPE_MAP:
+                base_type = JVM_TYPE_MAP[params_part[i]]
+                i += 1
+            else:
+                # 非法字符
+                base_type = f'<invalid_base:{params_part[i]}>'
+                parse_success = False
+                i += 1
+            params.append(base_type + '[]' * array_depth)
+        else:
+            # 非法字符 - 不在 JVM_TYPE_MAP 且不是 L 或 [
+            params.append(f'<invalid_char:{char}>')
+            parse_success = False
+            i += 1
+    
+    # 解析返回类型
+    return_type, ret_success = parse_jvm_type(return_part)
+    if not ret_success:
+        parse_success = False
+    
+    return tuple(params), return_type, parse_success
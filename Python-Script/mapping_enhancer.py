@@ -15,7 +15,9 @@ import os
 import re
 import sys
 from typing import Dict, List, Tuple, Optional, Set
-from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
 
 # 动态添加模块路径
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -44,13 +46,34 @@ def get_config():
 
 LOCAL_CONFIG = get_config()
 
+# 并行分析时每个任务包含的类数
+ANALYZE_CHUNK_SIZE = 256
+
+# 增强映射输出文件的写缓冲区大小
+OUTPUT_BUFFER_SIZE = 1 << 20
+
 
 # ==================== 映射增强器 ====================
 
 class MappingEnhancer:
     """映射增强器 - 生成增强的 mappings.txt"""
     
-    def __init__(self, class_map: Dict[str, str], member_map: Dict[str, List[dict]]):
+    __slots__ = (
+        'class_map', 'member_map', 'mapper', '_smali_classes', '_method_idx', '_field_idx',
+        'new_method_records', 'new_field_records', 'stats',
+    )
+    
+    def __init__(
+        self,
+        class_map: Dict[str, str],
+        member_map: Dict[str, List[dict]],
+        smali_classes: Dict[str, SmaliClass] = None
+    ):
+        """
+        Args:
+            smali_classes: 预先解析的 smali 类；为 None 时一次性并行扫描 SMALI_DIR，
+                避免分析时逐类读盘
+        """
         self.class_map = class_map
         self.member_map = member_map
         self.mapper = create_smali_mapper(
@@ -60,9 +83,20 @@ class MappingEnhancer:
             heuristic_prefix='auto_'
         )
         
-        # 新增的映射
-        self.new_method_mappings: Dict[str, List[Tuple[str, str, str]]] = defaultdict(list)
-        self.new_field_mappings: Dict[str, List[Tuple[str, str, str]]] = defaultdict(list)
+        # 批量加载 smali 类到映射器缓存（未扫描到的类仍按需从磁盘加载）
+        if smali_classes is None:
+            smali_classes = scan_all_smali_classes_parallel(smali_dir=LOCAL_CONFIG['SMALI_DIR'])
+        self._smali_classes = smali_classes
+        self.mapper.preload_smali_classes(smali_classes)
+        
+        # 现有映射索引
+        self._method_idx: Dict[str, Dict[Tuple[str, Optional[str]], Tuple[int, str]]] = {}
+        self._field_idx: Dict[str, Dict[str, str]] = {}
+        self._build_member_indices()
+        
+        # 新增的映射: 扁平记录 (obf_class, obf_name, orig_name, comment)，按分析顺序追加
+        self.new_method_records: List[Tuple[str, str, str, str]] = []
+        self.new_field_records: List[Tuple[str, str, str, str]] = []
         
         # 统计
         self.stats = {
@@ -106,7 +140,8 @@ class MappingEnhancer:
                     self.stats['inherited_methods'] += 1
                     source = 'inherited'
                 
-                self.new_method_mappings[obf_class].append((
+                self.new_method_records.append((
+                    obf_class,
                     method.name,
                     inferred,
                     f"# From {source}, sig: ({', '.join(method.param_types)}){method.return_type}"
@@ -125,43 +160,87 @@ class MappingEnhancer:
             # 尝试推断
             inferred = self.mapper.infer_field_name(obf_class, field_name, field_type)
             if inferred and inferred != field_name:
-                self.new_field_mappings[obf_class].append((
+                self.new_field_records.append((
+                    obf_class,
                     field_name,
                     inferred,
                     f"# Type: {field_type}"
                 ))
                 self.stats['new_field_mappings'] += 1
     
+    def _build_member_indices(self) -> None:
+        """
+        构建现有成员映射索引（一次遍历 member_map）
+        
+        方法: {obf_class: {(obf_name, descriptor 或 None): (序号, orig)}}
+        字段: {obf_class: {obf_name: orig}}
+        同键仅保留首次出现的条目，序号用于还原原先按顺序扫描的优先级
+        """
+        for obf_class, members in self.member_map.items():
+            methods = self._method_idx[obf_class] = {}
+            fields = self._field_idx[obf_class] = {}
+            for pos, m in enumerate(members):
+                if m.get('is_method'):
+                    key = (m['obf'], m.get('descriptor') or None)
+                    if key not in methods:
+                        methods[key] = (pos, m['orig'])
+                else:
+                    fields.setdefault(m['obf'], m['orig'])
+    
     def _get_existing_method_mapping(self, obf_class: str, obf_name: str, descriptor: str) -> Optional[str]:
         """检查是否已有方法映射"""
-        if obf_class not in self.member_map:
+        methods = self._method_idx.get(obf_class)
+        if not methods:
             return None
         
-        for m in self.member_map[obf_class]:
-            if m.get('is_method') and m['obf'] == obf_name:
-                # 如果有签名，需要匹配签名
-                if m.get('descriptor') and m['descriptor'] == descriptor:
-                    return m['orig']
-                elif not m.get('descriptor'):
-                    return m['orig']
-        return None
+        # 有签名的条目需签名一致；无签名的条目仅按名称匹配；两者都命中时取靠前者
+        exact = methods.get((obf_name, descriptor)) if descriptor else None
+        loose = methods.get((obf_name, None))
+        if exact and loose:
+            return min(exact, loose)[1]
+        hit = exact or loose
+        return hit[1] if hit else None
     
     def _get_existing_field_mapping(self, obf_class: str, obf_name: str) -> Optional[str]:
         """检查是否已有字段映射"""
-        if obf_class not in self.member_map:
+        fields = self._field_idx.get(obf_class)
+        if not fields:
             return None
-        
-        for m in self.member_map[obf_class]:
-            if not m.get('is_method') and m['obf'] == obf_name:
-                return m['orig']
-        return None
+        return fields.get(obf_name)
     
-    def analyze_all_classes(self) -> None:
-        """分析所有类"""
+    def analyze_all_classes(self, max_workers: int = None) -> None:
+        """
+        分析所有类
+        
+        类之间相互独立，按 ANALYZE_CHUNK_SIZE 分块后交给进程池并行分析，
+        结果按分块顺序合并，与串行分析的输出一致。类数不足一块或
+        max_workers <= 1 时直接串行执行。
+        """
         print(f"分析所有类...")
         
-        for obf_class in self.class_map.keys():
-            self.analyze_class(obf_class)
+        if max_workers is None:
+            max_workers = CONFIG['MAX_WORKERS']
+        
+        obf_classes = list(self.class_map.keys())
+        chunks = [
+            obf_classes[i:i + ANALYZE_CHUNK_SIZE]
+            for i in range(0, len(obf_classes), ANALYZE_CHUNK_SIZE)
+        ]
+        
+        if max_workers <= 1 or len(chunks) <= 1:
+            for obf_class in obf_classes:
+                self.analyze_class(obf_class)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(chunks)),
+                initializer=_init_analyze_worker,
+                initargs=(self.class_map, self.member_map, LOCAL_CONFIG['SMALI_DIR'], self._smali_classes)
+            ) as executor:
+                for methods, fields, stats in executor.map(_analyze_chunk, chunks):
+                    self.new_method_records.extend(methods)
+                    self.new_field_records.extend(fields)
+                    for key, value in stats.items():
+                        self.stats[key] += value
         
         print(f"  类分析数: {self.stats['classes_analyzed']}")
         print(f"  方法分析数: {self.stats['methods_analyzed']}")
@@ -171,112 +250,122 @@ class MappingEnhancer:
         print(f"    - 继承推断: {self.stats['inherited_methods']}")
         print(f"    - 启发式推断: {self.stats['heuristic_methods']}")
     
-    def generate_enhanced_mapping(self, output_path: str) -> None:
-        """生成增强的映射文件"""
-        # 读取原始映射文件
-        with open(LOCAL_CONFIG['MAPPING_FILE'], 'r', encoding='utf-8') as f:
-            original_content = f.read()
-        
-        # 解析原始映射，按类分组
-        lines = original_content.split('\n')
-        
-        # 构建增强映射
-        enhanced_lines = []
-        enhanced_lines.append("# Enhanced Mappings")
-        enhanced_lines.append("# Generated by mapping_enhancer.py")
-        enhanced_lines.append(f"# New method mappings: {self.stats['new_method_mappings']}")
-        enhanced_lines.append(f"# New field mappings: {self.stats['new_field_mappings']}")
-        enhanced_lines.append("")
-        
-        current_class = None
-        class_block = []
-        
-        for line in lines:
-            # 检测类定义
-            class_match = re.match(r'^(\S+)\s*->\s*(\S+):$', line)
-            
-            if class_match:
-                # 输出前一个类的内容（包括新增映射）
-                if current_class and class_block:
-                    enhanced_lines.extend(class_block)
-                    
-                    # 添加新增的方法映射
-                    if current_class in self.new_method_mappings:
-                        enhanced_lines.append("    # === NEW METHOD MAPPINGS ===")
-                        for obf, orig, comment in self.new_method_mappings[current_class]:
-                            enhanced_lines.append(f"    {obf}() -> {orig}  {comment}")
-                    
-                    # 添加新增的字段映射
-                    if current_class in self.new_field_mappings:
-                        enhanced_lines.append("    # === NEW FIELD MAPPINGS ===")
-                        for obf, orig, comment in self.new_field_mappings[current_class]:
-                            enhanced_lines.append(f"    {obf} -> {orig}  {comment}")
-                
-                current_class = class_match.group(1)
-                class_block = [line]
-            elif current_class:
-                class_block.append(line)
-            else:
-                enhanced_lines.append(line)
+    @staticmethod
+    def _group_records(records: List[Tuple[str, str, str, str]]) -> Dict[str, List[Tuple[str, str, str, str]]]:
+        """
+        按类分组新增映射记录（保持类首次出现顺序及类内顺序）
         
-        # 处理最后一个类
-        if current_class and class_block:
-            enhanced_lines.extend(class_block)
-            
-            if current_class in self.new_method_mappings:
-                enhanced_lines.append("    # === NEW METHOD MAPPINGS ===")
-                for obf, orig, comment in self.new_method_mappings[current_class]:
-                    enhanced_lines.append(f"    {obf}() -> {orig}  {comment}")
-            
-            if current_class in self.new_field_mappings:
-                enhanced_lines.append("    # === NEW FIELD MAPPINGS ===")
-                for obf, orig, comment in self.new_field_mappings[current_class]:
-                    enhanced_lines.append(f"    {obf} -> {orig}  {comment}")
+        记录按类依次追加，同类记录相邻，groupby 一次线性遍历即可完成分组
+        """
+        grouped: Dict[str, List[Tuple[str, str, str, str]]] = {}
+        for obf_class, group in groupby(records, key=itemgetter(0)):
+            grouped.setdefault(obf_class, []).extend(group)
+        return grouped
+    
+    @staticmethod
+    def _iter_new_members(methods, fields, with_headers: bool = True):
+        """逐行生成某个类新增的方法/字段映射"""
+        if methods:
+            if with_headers:
+                yield "    # === NEW METHOD MAPPINGS ===\n"
+            for _, obf, orig, comment in methods:
+                yield f"    {obf}() -> {orig}  {comment}\n"
         
-        # 添加未在原映射中的类
-        existing_classes = set()
-        for line in lines:
-            class_match = re.match(r'^(\S+)\s*->\s*(\S+):$', line)
-            if class_match:
-                existing_classes.add(class_match.group(1))
+        if fields:
+            if with_headers:
+                yield "    # === NEW FIELD MAPPINGS ===\n"
+            for _, obf, orig, comment in fields:
+                yield f"    {obf} -> {orig}  {comment}\n"
+    
+    def _iter_enhanced_lines(self):
+        """逐行生成增强映射文件内容"""
+        yield "# Enhanced Mappings\n"
+        yield "# Generated by mapping_enhancer.py\n"
+        yield f"# New method mappings: {self.stats['new_method_mappings']}\n"
+        yield f"# New field mappings: {self.stats['new_field_mappings']}\n"
+        yield "\n"
         
-        new_class_mappings = []
-        for obf_class in self.new_method_mappings.keys():
-            if obf_class not in existing_classes:
-                orig_class = self.class_map.get(obf_class, obf_class)
-                new_class_mappings.append((obf_class, orig_class))
+        methods_by_class = self._group_records(self.new_method_records)
+        fields_by_class = self._group_records(self.new_field_records)
         
-        for obf_class in self.new_field_mappings.keys():
-            if obf_class not in existing_classes and obf_class not in [c[0] for c in new_class_mappings]:
-                orig_class = self.class_map.get(obf_class, obf_class)
-                new_class_mappings.append((obf_class, orig_class))
+        # 现有类: 原有成员 + 新增映射
+        for obf_class, orig_class in self.class_map.items():
+            yield f"{obf_class} -> {orig_class}:\n"
+            for m in self.member_map.get(obf_class, ()):
+                ret = m.get('return_type')
+                prefix = f"{ret} " if ret else ""
+                yield f"    {prefix}{m['obf']}{m.get('signature', '')} -> {m['orig']}\n"
+            yield from self._iter_new_members(
+                methods_by_class.get(obf_class), fields_by_class.get(obf_class)
+            )
         
-        if new_class_mappings:
-            enhanced_lines.append("")
-            enhanced_lines.append("# === NEW CLASS MAPPINGS ===")
-            for obf_class, orig_class in new_class_mappings:
-                enhanced_lines.append(f"{obf_class} -> {orig_class}:")
-                
-                if obf_class in self.new_method_mappings:
-                    for obf, orig, comment in self.new_method_mappings[obf_class]:
-                        enhanced_lines.append(f"    {obf}() -> {orig}  {comment}")
-                
-                if obf_class in self.new_field_mappings:
-                    for obf, orig, comment in self.new_field_mappings[obf_class]:
-                        enhanced_lines.append(f"    {obf} -> {orig}  {comment}")
+        # 未在原映射中的类
+        new_classes = [c for c in methods_by_class if c not in self.class_map]
+        new_classes.extend(
+            c for c in fields_by_class
+            if c not in self.class_map and c not in methods_by_class
+        )
+        if new_classes:
+            yield "\n"
+            yield "# === NEW CLASS MAPPINGS ===\n"
+            for obf_class in new_classes:
+                yield f"{obf_class} -> {obf_class}:\n"
+                yield from self._iter_new_members(
+                    methods_by_class.get(obf_class), fields_by_class.get(obf_class), with_headers=False
+                )
+    
+    def generate_enhanced_mapping(self, output_path: str) -> None:
+        """
+        生成增强的映射文件
         
-        # 写入文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(enhanced_lines))
+        直接由已解析的 class_map / member_map 输出，不再重新读取并解析原始映射文件。
+        原文件中的注释与行号前缀不会保留。
+        各行由生成器流式写入大缓冲区文件，不构建完整的行列表或拼接字符串。
+        """
+        with open(output_path, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+            f.writelines(self._iter_enhanced_lines())
         
         print(f"\n增强映射已生成: {output_path}")
 
 
+# ==================== 并行分析 ====================
+
+# 工作进程内的增强器，由 initializer 创建，避免每个任务重复传输映射表
+_worker_enhancer: Optional[MappingEnhancer] = None
+
+
+def _init_analyze_worker(
+    class_map: Dict[str, str],
+    member_map: Dict[str, List[dict]],
+    smali_dir: str,
+    smali_classes: Dict[str, SmaliClass]
+) -> None:
+    """工作进程初始化: 以主进程已扫描的 smali 类构建本进程的 MappingEnhancer"""
+    global _worker_enhancer
+    LOCAL_CONFIG['SMALI_DIR'] = smali_dir
+    _worker_enhancer = MappingEnhancer(class_map, member_map, smali_classes)
+
+
+def _analyze_chunk(chunk: List[str]) -> Tuple[List[tuple], List[tuple], Dict[str, int]]:
+    """分析一块类，返回 (新增方法映射记录, 新增字段映射记录, 统计)"""
+    enhancer = _worker_enhancer
+    enhancer.new_method_records = []
+    enhancer.new_field_records = []
+    enhancer.stats = dict.fromkeys(enhancer.stats, 0)
+    
+    for obf_class in chunk:
+        enhancer.analyze_class(obf_class)
+    
+    return enhancer.new_method_records, enhancer.new_field_records, enhancer.stats
+
+
 # ==================== 从代码推断的额外映射 ====================
 
 class CodeBasedMappingExtractor:
     """从反编译代码中提取额外映射"""
     
+    __slots__ = ()
+    
     # 字符串键名模式
     STRING_KEY_PATTERNS = [
         # SharedPreferences
@@ -301,6 +390,10 @@ class CodeBasedMappingExtractor:
         """从代码中提取字段名线索"""
         hints = {}
         
+        # 子串预筛: 绝大多数文件不含该模式，用 C 层子串查找跳过整段正则扫描
+        if 'getString' not in code or 'this.' not in code:
+            return hints
+        
         for match in cls.FIELD_ASSIGNMENT_PATTERN.finditer(code):
             field_name = match.group(1)
             key = match.group(2)
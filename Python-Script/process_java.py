@@ -1,6 +1,15 @@
+import gc
+import mmap
+import multiprocessing
 import os
+import pickle
 import re
+import sys
+import itertools
 import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
 
 # 导入 Smali 提取器
 try:
@@ -11,7 +20,7 @@ except ImportError:
 
 # 导入 Tree-sitter 解析器（强制）
 try:
-    from ts_java_parser import GlobalTypeIndex, TreeSitterJavaParser, init_global_type_index
+    from ts_java_parser import GlobalTypeIndex, TreeSitterJavaParser, init_global_type_index, set_global_type_index
     TREE_SITTER_AVAILABLE = True
 except ImportError:
     TREE_SITTER_AVAILABLE = False
@@ -34,6 +43,249 @@ try:
 except ImportError:
     AST_DEOBFUSCATOR_AVAILABLE = False
 
+
+# ==================== 预编译正则 ====================
+# 固定模式在模块加载时编译一次，避免被步骤 2 等处大量动态模式挤出 re 内部缓存后反复编译
+
+# 映射文件
+_RE_MAP_MEMBER_STD = re.compile(r'^(?:\d+:\d+:)?(\S+)\s+(\S+?)(\(.*?\))?\s+->\s+(\S+)$')
+_RE_MAP_MEMBER_ENH = re.compile(r'^(\S+?)(\(\))?\s+->\s+(\S+)$')
+
+# 源码预处理
+_RE_STRING_LIT = re.compile(r'"(?:[^"\\]|\\.)*"')
+_RE_JADX_WARN = re.compile(r'/\* JADX WARNING: .*? \*/', re.DOTALL)
+_RE_FILE_DELIMITER = re.compile(r'(=+\n// FILE_PATH: (.+?)\n=+)')
+_RE_FILE_DELIMITER_BYTES = re.compile(rb'(=+\n// FILE_PATH: (.+?)\n=+)')
+_RE_CLASS_DECL_OPEN = re.compile(r'((?:public|abstract|final|class|interface|enum)[^{]*\{)')
+
+# deobfuscate_content
+_RE_IMPORT = re.compile(r'^import\s+([\w\.]+);', re.MULTILINE)
+_RE_PACKAGE = re.compile(r'^package\s+[\w\.]+;', re.MULTILINE)
+_RE_ANON_CLASS = re.compile(r'[.$]AnonymousClass(\d+)')
+_RE_FQCN_SHORTNAME = re.compile(r'(com\.corrodinggames\.[a-zA-Z0-9_.]+)\.([a-z][a-zA-Z0-9]*)(?=[(<\s])')
+_RE_FQCN_DOT = re.compile(r'(__FQCN_\d+__)\.([a-zA-Z_]\w*)')
+_RE_METHOD_DECL = re.compile(r'\b(int|boolean|void|float|double|long|short|byte|char|[A-Z][a-zA-Z0-9_]*)\s+([a-z][a-zA-Z0-9]?)\s*\(')
+_RE_FORNAME = re.compile(r'Class\.forName\s*\(\s*"([^"]+)"\s*\)')
+_RE_GET_METHOD = re.compile(r'(getMethod|getDeclaredMethod)\s*\(\s*"(\w+)"')
+
+# 占位符
+_RE_STR_PLACEHOLDER = re.compile('\x01(\\d+)\x02')
+_RE_CLASS_PLACEHOLDER = re.compile(
+    r'__(?:FQCN_\d+|CLASSNAME_[0-9a-f]+|SHORTCLS_[0-9a-f]+|FQCNSHORT_[0-9a-f]+)__'
+)
+
+# 步骤 3 字段替换：排除类声明关键字/类型关键字后的位置
+_FIELD_PROTECTED_PREFIXES = (
+    r'(?<!\bclass\s)'
+    r'(?<!\bextends\s)'
+    r'(?<!\bimplements\s)'
+    r'(?<!\bnew\s)'
+    r'(?<!\bpublic\s)'
+    r'(?<!\bprivate\s)'
+    r'(?<!\bprotected\s)'
+    r'(?<!\binterface\s)'
+    r'(?<!\benum\s)'
+    r'(?<!\bstatic\s)'
+    r'(?<!\bfinal\s)'
+    r'(?<!\bvoid\s)'
+    r'(?<!\bint\s)'
+    r'(?<!\blong\s)'
+    r'(?<!\bfloat\s)'
+    r'(?<!\bdouble\s)'
+    r'(?<!\bboolean\s)'
+    r'(?<!\bbyte\s)'
+    r'(?<!\bchar\s)'
+    r'(?<!\bshort\s)'
+)
+
+
+# re.escape 为逐字符的纯 Python 实现，同一类名/成员名在各步骤、各文件间反复转义，缓存结果
+_re_escape = lru_cache(maxsize=None)(re.escape)
+
+
+@lru_cache(maxsize=None)
+def _class_ref_re(obf):
+    """步骤 1: 完整单词边界的全限定类名"""
+    return re.compile(r'\b' + _re_escape(obf) + r'\b')
+
+
+@lru_cache(maxsize=None)
+def _pkg_short_class_re(pkg, short):
+    """步骤 1.5: 包名.短类名"""
+    return re.compile(_re_escape(pkg) + r'\.' + _re_escape(short) + r'\b')
+
+
+# 步骤 3 的成员替换正则只随类的成员名集合变化，跨文件缓存编译结果
+# names 为按长度降序排列的混淆名元组，合并为一个交替组，每类上下文只需扫描一遍
+
+def _names_alternation(names):
+    return '(?:' + '|'.join(_re_escape(n) for n in names) + ')'
+
+
+@lru_cache(maxsize=None)
+def _method_call_re(names):
+    """方法调用: 标识符后紧跟括号（避免替换类声明上下文）"""
+    return re.compile(r'(?<![.\w])' + _names_alternation(names) + r'(?=\s*\()')
+
+
+@lru_cache(maxsize=None)
+def _field_access_re(names):
+    """
+    字段访问的三种上下文合并为一个交替组，一次 sub 完成，每处出现最多改写一次
+    （分多遍替换时，已改写的原名若恰好等于另一个混淆名会被再次改写）:
+    - this.field 或 obj.field（点号后，非方法调用）
+    - 独立字段访问（在赋值、分号、逗号等结束符前）
+    - 数组索引访问
+    """
+    alternation = _names_alternation(names)
+    return re.compile(
+        r'(?<=\.)' + alternation + r'\b(?!\s*\()'
+        r'|' + _FIELD_PROTECTED_PREFIXES + r'\b' + alternation + r'\b(?=\s*[=;,\)\]])'
+        r'|' + _FIELD_PROTECTED_PREFIXES + r'\b' + alternation + r'\b(?=\s*\[)'
+    )
+
+
+# 每个类的成员替换表与正则只需构建一次；以成员列表对象为键（同时记录长度，列表被追加后重建）
+_member_renames_cache = {}
+
+
+def _class_member_renames(members):
+    """
+    拆分类的方法/字段映射并编译步骤 3 所需正则（跨文件缓存）
+    
+    Returns:
+        (method_renames, method_re, field_renames, field_re)
+        renames 为 {混淆名: 原名}，按混淆名长度降序；同一混淆名只取第一个映射（重载方法的后续映射不会再命中）
+    """
+    cached = _member_renames_cache.get(id(members))
+    if cached is not None and cached[0] is members and cached[1] == len(members):
+        return cached[2]
+    
+    methods = sorted((m for m in members if m['is_method']), key=lambda x: len(x['obf']), reverse=True)
+    fields = sorted((m for m in members if not m['is_method']), key=lambda x: len(x['obf']), reverse=True)
+    method_renames = {}
+    for m in methods:
+        method_renames.setdefault(m['obf'], m['orig'])
+    field_renames = {}
+    for m in fields:
+        field_renames.setdefault(m['obf'], m['orig'])
+    
+    method_re = _method_call_re(tuple(method_renames)) if method_renames else None
+    field_re = _field_access_re(tuple(field_renames)) if field_renames else None
+    
+    result = (method_renames, method_re, field_renames, field_re)
+    _member_renames_cache[id(members)] = (members, len(members), result)
+    return result
+
+
+# 步骤 2 中形如 `关键字 短类名\b` 的上下文合并为一个关键字交替组，一次扫描完成：
+# 类声明、对象创建、访问修饰符 + 类型、instanceof
+_SHORT_CLASS_KEYWORDS = (
+    'class', 'extends', 'interface', 'enum',
+    'new',
+    'public', 'private', 'protected', 'static', 'final', 'abstract',
+    'instanceof',
+)
+_SHORT_CLASS_KEYWORD_PREFIX = r'\b(' + '|'.join(_SHORT_CLASS_KEYWORDS) + r')\s+'
+
+# 步骤 2 其余短类名替换的安全上下文: (前缀正则, 后缀正则, 前缀替换, 后缀替换)
+# 匹配 前缀 + 短类名 + 后缀，替换为 前缀替换 + 原短类名 + 后缀替换；前缀/后缀中不含捕获组
+_SHORT_CLASS_CONTEXTS = (
+    # 类声明
+    (r'\bimplements\s+', r'(?=[\s,{])', 'implements ', ''),
+    
+    # 类型转换
+    (r'\(\s*', r'\s*\)', '(', ')'),
+    
+    # 泛型
+    (r'<', r'>', '<', '>'),
+    (r'<', r',', '<', ','),
+    (r',\s*', r'>', ', ', '>'),
+    (r'<\?\s+extends\s+', r'\b', '<? extends ', ''),
+    (r'<\?\s+super\s+', r'\b', '<? super ', ''),
+    
+    # .class 访问
+    (r'\b', r'\.class\b', '', '.class'),
+    
+    # 变量声明 (Type varName)
+    (r'\b', r'\b(?=\s+\w+\s*[;=,\)])', '', ''),
+    
+    # 数组类型
+    (r'\b', r'\b(?=\s*\[\s*\])', '', ''),
+    
+    # 方法返回类型
+    (r'(?<=\s)', r'\b(?=\s+\w+\s*\()', '', ''),
+    
+    # 参数类型
+    (r'(?<=\()\s*', r'\b(?=\s+\w)', '', ''),
+    (r'(?<=,)\s*', r'\b(?=\s+\w)', ' ', ''),
+)
+
+
+# 步骤 1 类名查找：一次扫描 content 中由 [\w.$] 组成的连续片段，展开为所有可能在单词边界处
+# 出现的子串集合，再与全部混淆类名求交集，无需对每个类名做子串查找（pyahocorasick 不可用时的替代）
+_RE_DOTTED_RUN = re.compile(r'[\w.$]+')
+_RE_WORD_TOKEN = re.compile(r'\w+')
+_RE_PLAIN_CLASS_NAME = re.compile(r'\w(?:[\w.$]*\w)?')
+_fqcn_index_slot = (None, None)
+
+
+def _fqcn_candidate_index(sorted_obf_classes):
+    """
+    构建（或复用）sorted_obf_classes 的查找索引
+    
+    Returns:
+        (positions, always): positions 为 {类名: 序号}，仅含首尾为单词字符、中间只有 [\w.$] 的类名；
+        always 为其余无法用片段集合判定的类名序号
+    """
+    global _fqcn_index_slot
+    cached_list, cached_index = _fqcn_index_slot
+    if cached_list is sorted_obf_classes:
+        return cached_index
+    
+    positions = {}
+    always = []
+    for i, obf in enumerate(sorted_obf_classes):
+        if _RE_PLAIN_CLASS_NAME.fullmatch(obf):
+            positions.setdefault(obf, i)
+        else:
+            always.append(i)
+    
+    _fqcn_index_slot = (sorted_obf_classes, (positions, always))
+    return positions, always
+
+
+def _boundary_substrings(content):
+    """
+    content 中所有以单词边界开始、以单词边界结束且只含 [\w.$] 的子串
+    
+    对每个连续片段（如 com.ex.a$b），取任一标识符的起点到其后任一标识符的终点
+    """
+    found = set()
+    for run in _RE_DOTTED_RUN.findall(content):
+        if '.' not in run and '$' not in run:
+            found.add(run)
+            continue
+        pieces = [(m.start(), m.end()) for m in _RE_WORD_TOKEN.finditer(run)]
+        for i, (piece_start, _) in enumerate(pieces):
+            for _, piece_end in pieces[i:]:
+                found.add(run[piece_start:piece_end])
+    return found
+
+
+def _fqcn_candidates(content, sorted_obf_classes):
+    """
+    返回在 content 中以完整单词出现的类名序号（保持 sorted_obf_classes 原有顺序）
+    
+    always 中的类名无法预先判定，仍逐个做子串检查
+    """
+    positions, always = _fqcn_candidate_index(sorted_obf_classes)
+    indices = [positions[obf] for obf in _boundary_substrings(content).intersection(positions)]
+    indices.extend(i for i in always if sorted_obf_classes[i] in content)
+    indices.sort()
+    return indices
+
+
 def parse_mapping(mapping_file):
     """
     解析 ProGuard 映射文件（兼容增强映射格式）。
@@ -46,7 +298,8 @@ def parse_mapping(mapping_file):
     current_obf_class = None
 
     with open(mapping_file, 'r', encoding='utf-8') as f:
-        for line in f:
+        # 文本模式已统一换行符，按 '\n' 切分与逐行迭代等价（splitlines 还会在 \f 等字符处切分）
+        for line in f.read().split('\n'):
             line_raw = line
             line = line.strip()
             if not line or line.startswith('#'):
@@ -58,79 +311,127 @@ def parse_mapping(mapping_file):
             
             # 类映射行：不以空格开头
             if not line_raw.startswith(' '):
-                match = re.match(r'^(.*) -> (.*):$', line)
-                if match:
-                    obf_class = match.group(1)
-                    orig_class = match.group(2)
-                    class_map[obf_class] = orig_class
-                    current_obf_class = obf_class
-                    member_map[current_obf_class] = []
+                # 等价于 ^(.*) -> (.*):$（取最后一个 ' -> '）
+                if line.endswith(':'):
+                    obf_class, sep, orig_class = line[:-1].rpartition(' -> ')
+                    if sep:
+                        class_map[obf_class] = orig_class
+                        current_obf_class = obf_class
+                        member_map[current_obf_class] = []
+                continue
+            
+            # 成员映射行：以空格开头
+            # 标准格式: [line_range:]return_type obf_name[(params)] -> orig_name
+            # 增强格式: obf_name() -> orig_name (无返回类型)
+            if not current_obf_class:
+                continue
+            
+            # 常规行按空白切分后直接分派，不规则行回退到正则
+            tokens = line.split()
+            if len(tokens) == 4 and tokens[2] == '->':
+                # 标准格式
+                return_type, name_part, _, orig_name = tokens
+                # 去除行号前缀 N:M:
+                if return_type[0].isdecimal():
+                    head = return_type.split(':', 2)
+                    if len(head) == 3 and head[0].isdecimal() and head[1].isdecimal() and head[2]:
+                        return_type = head[2]
+                # 参数列表: 名称后首个 '(' 起至行尾 ')'
+                paren = name_part.find('(', 1) if name_part.endswith(')') else -1
+                if paren != -1:
+                    obf_name, args = name_part[:paren], name_part[paren:]
+                else:
+                    obf_name, args = name_part, None
+                member_map[current_obf_class].append({
+                    'obf': obf_name,
+                    'orig': orig_name,
+                    'is_method': args is not None,
+                    'signature': args if args else '',
+                    'return_type': return_type
+                })
+                continue
+            
+            if len(tokens) == 3 and tokens[1] == '->':
+                # 增强格式（无返回类型）: obf_name() -> orig_name 或 obf_name -> orig_name
+                name_part, _, orig_name = tokens
+                has_parens = len(name_part) > 2 and name_part.endswith('()')
+                member_map[current_obf_class].append({
+                    'obf': name_part[:-2] if has_parens else name_part,
+                    'orig': orig_name,
+                    'is_method': has_parens,
+                    'signature': '()' if has_parens else '',
+                    'return_type': ''
+                })
+                continue
+            
+            # 不规则行（如参数列表含空格）：回退到正则
+            match = _RE_MAP_MEMBER_STD.match(line)
+            if match:
+                return_type = match.group(1)
+                obf_name = match.group(2)
+                args = match.group(3)  # "(int,int)" 或 None
+                orig_name = match.group(4)
+                member_map[current_obf_class].append({
+                    'obf': obf_name,
+                    'orig': orig_name,
+                    'is_method': args is not None,
+                    'signature': args if args else '',
+                    'return_type': return_type
+                })
             else:
-                # 成员映射行：以空格开头
-                # 标准格式: [line_range:]return_type obf_name[(params)] -> orig_name
-                # 增强格式: obf_name() -> orig_name (无返回类型)
-                
-                # 先尝试标准格式
-                match = re.match(r'^(?:\d+:\d+:)?(\S+)\s+(\S+?)(\(.*?\))?\s+->\s+(\S+)$', line)
-                if match and current_obf_class:
-                    return_type = match.group(1)
-                    obf_name = match.group(2)
-                    args = match.group(3)  # "(int,int)" 或 None
-                    orig_name = match.group(4)
+                match_enhanced = _RE_MAP_MEMBER_ENH.match(line)
+                if match_enhanced:
+                    obf_name = match_enhanced.group(1)
+                    has_parens = match_enhanced.group(2) is not None
+                    orig_name = match_enhanced.group(3)
                     member_map[current_obf_class].append({
                         'obf': obf_name,
                         'orig': orig_name,
-                        'is_method': args is not None,
-                        'signature': args if args else '',
-                        'return_type': return_type
+                        'is_method': has_parens,
+                        'signature': '()' if has_parens else '',
+                        'return_type': ''
                     })
-                else:
-                    # 尝试增强格式（无返回类型）: obf_name() -> orig_name 或 obf_name -> orig_name
-                    match_enhanced = re.match(r'^(\S+?)(\(\))?\s+->\s+(\S+)$', line)
-                    if match_enhanced and current_obf_class:
-                        obf_name = match_enhanced.group(1)
-                        has_parens = match_enhanced.group(2) is not None
-                        orig_name = match_enhanced.group(3)
-                        member_map[current_obf_class].append({
-                            'obf': obf_name,
-                            'orig': orig_name,
-                            'is_method': has_parens,
-                            'signature': '()' if has_parens else '',
-                            'return_type': ''
-                        })
     return class_map, member_map
 
 
 def protect_strings(content):
     """
     保护字符串字面量，避免被错误替换。
-    返回: (处理后内容, 字符串字典)
+    占位符为 \\x01序号\\x02：控制字符不会出现在 Java 源码中，也不属于 \\w，
+    后续各步正则不会把它当作标识符的一部分。
+    返回: (处理后内容, 字符串列表)
     """
-    string_map = {}
-    counter = [0]  # 使用列表以便在闭包中修改
+    strings = []
+    # 无双引号则不存在字符串字面量，省去一次全文扫描与重建
+    if '"' not in content:
+        return content, strings
     
     def replace_string(m):
-        key = f'__STR_{counter[0]}__'
-        string_map[key] = m.group(0)
-        counter[0] += 1
-        return key
+        strings.append(m.group(0))
+        return f'\x01{len(strings) - 1}\x02'
     
     # 匹配双引号字符串（处理转义）
-    content = re.sub(r'"(?:[^"\\]|\\.)*"', replace_string, content)
+    content = _RE_STRING_LIT.sub(replace_string, content)
     
-    return content, string_map
+    return content, strings
 
 
-def restore_strings(content, string_map):
-    """恢复被保护的字符串字面量。"""
-    for key, value in string_map.items():
-        content = content.replace(key, value)
-    return content
+def restore_strings(content, strings):
+    """恢复被保护的字符串字面量（单次扫描）。"""
+    if not strings:
+        return content
+    count = len(strings)
+    
+    def restore(m):
+        idx = int(m.group(1))
+        return strings[idx] if idx < count else m.group(0)
+    
+    return _RE_STR_PLACEHOLDER.sub(restore, content)
 
 
 def filter_jadx_comments(content):
     """移除 JADX 警告注释，避免干扰解析。"""
-    return re.sub(r'/\* JADX WARNING: .*? \*/', '', content, flags=re.DOTALL)
+    return _RE_JADX_WARN.sub('', content)
 
 
 
@@ -139,6 +440,13 @@ def filter_jadx_comments(content):
 
 SMALI_OUTPUT_DIR = '/Users/hoto/PC_Java/smali_output'
 
+# JADX 反编译失败标记；逐个 `in` 查找走 C 层快速子串搜索，实测快于合并成一个交替正则
+_DECOMPILE_FAILURE_MARKERS = (
+    'Code decompiled incorrectly',
+    'JADX WARN: Code restructure failed',
+    'Method decompilation failed',
+)
+
 def get_smali_fallback(obf_class_name: str) -> str:
     """
     从 smali_output 文件夹读取预生成的 smali 信息
@@ -168,14 +476,7 @@ def inject_smali_for_failed_methods(content: str, obf_class_name: str) -> str:
         增强后的代码内容
     """
     # 检测是否有反编译失败标记
-    failure_patterns = [
-        'Code decompiled incorrectly',
-        'JADX WARN: Code restructure failed',
-        'Method decompilation failed'
-    ]
-    
-    has_failures = any(p in content for p in failure_patterns)
-    if not has_failures:
+    if not any(marker in content for marker in _DECOMPILE_FAILURE_MARKERS):
         return content
     
     # 读取 smali 信息
@@ -188,11 +489,11 @@ def inject_smali_for_failed_methods(content: str, obf_class_name: str) -> str:
     smali_comment += smali_info.replace("*/", "* /")  # 避免注释嵌套
     smali_comment += "\n=== END SMALI ===*/\n"
     
-    # 在第一个 { 后插入
-    match = re.search(r'((?:public|abstract|final|class|interface|enum)[^{]*\{)', content)
+    # 在第一个 { 后插入（一次拼接，只复制一遍 content）
+    match = _RE_CLASS_DECL_OPEN.search(content)
     if match:
         insert_pos = match.end()
-        content = content[:insert_pos] + smali_comment + content[insert_pos:]
+        content = ''.join((content[:insert_pos], smali_comment, content[insert_pos:]))
     
     return content
 
@@ -204,51 +505,49 @@ def deobfuscate_content(content, current_obf_full_class, class_map, member_map,
         type_index: 可选的 GlobalTypeIndex 实例用于类型解析
     """
     # === 步骤 0: 保护字符串字面量 ===
-    content, string_map = protect_strings(content)
+    content, strings = protect_strings(content)
     
     # PRE-SCAN: 提取导入和当前包信息
-    original_imports = re.findall(r'^import\s+([\w\.]+);', content, flags=re.MULTILINE)
+    original_imports = _RE_IMPORT.findall(content)
     current_package = '.'.join(current_obf_full_class.split('.')[:-1])
     
     # === 步骤 0.5: 标准化 JADX 匿名类名 ===
-    # 处理 .AnonymousClassN 和 $AnonymousClassN 两种模式
-    content = re.sub(r'\.AnonymousClass(\d+)', r'$\1', content)
-    content = re.sub(r'\$AnonymousClass(\d+)', r'$\1', content)
+    # 处理 .AnonymousClassN 和 $AnonymousClassN 两种模式（一次扫描；多数文件不含匿名类，先做子串判断）
+    if 'AnonymousClass' in content:
+        content = _RE_ANON_CLASS.sub(r'$\1', content)
 
     # === 步骤 0.6: 预保护 FQCN 中的短类名（包含无映射的类）===
     # 匹配模式: 包名.短类名( 或 包名.短类名<
     # 保护这些短类名不被后续成员替换污染
-    fqcn_shortname_placeholders = {}
-    fqcn_pattern = re.compile(r'(com\.corrodinggames\.[a-zA-Z0-9_.]+)\.([a-z][a-zA-Z0-9]*)(?=[(<\s])')
+    # 类名占位符统一登记到 placeholders（占位符 -> 恢复文本）；
+    # 编号取自单调计数器，不同键不会像 24 位 hash 截断那样碰撞
+    placeholders = {}
+    placeholder_seq = itertools.count()
     
     def protect_fqcn_shortname(m):
         pkg = m.group(1)
         short = m.group(2)
         # 仅保护可能与成员冲突的短名（1-2字符）
         if len(short) <= 2:
-            placeholder = f'__FQCNSHORT_{hash(pkg + short) & 0xFFFFFF:06x}__'
-            fqcn_shortname_placeholders[placeholder] = short
+            placeholder = f'__FQCNSHORT_{next(placeholder_seq):x}__'
+            placeholders[placeholder] = short
             return f'{pkg}.{placeholder}'
         return m.group(0)
     
-    content = fqcn_pattern.sub(protect_fqcn_shortname, content)
+    content = _RE_FQCN_SHORTNAME.sub(protect_fqcn_shortname, content)
 
     # === 步骤 1: 全限定类名替换 (使用占位符保护避免二次污染) ===
-    fqcn_placeholders = {}
-    
-    for i, obf in enumerate(sorted_obf_classes):
+    # 候选类名在替换开始前已确定出现过，只需依次替换（长名称优先）
+    for i in _fqcn_candidates(content, sorted_obf_classes):
+        obf = sorted_obf_classes[i]
         if obf in class_map:
-            obf_escaped = re.escape(obf)
-            pattern = r'\b' + obf_escaped + r'\b'
-            
-            if obf in content: 
-                placeholder = f'__FQCN_{i}__'
-                content = re.sub(pattern, placeholder, content)
-                fqcn_placeholders[placeholder] = class_map[obf]
+            placeholder = f'__FQCN_{i}__'
+            content = _class_ref_re(obf).sub(placeholder, content)
+            placeholders[placeholder] = class_map[obf]
 
     # === 保护 FQCN 占位符后的标识符 (避免 e.h 中的 h 被误伤) ===
     # 将 __FQCN_1__.h 转换为 __FQCN_1__._DOT_h
-    content = re.sub(r'(__FQCN_\d+__)\.([a-zA-Z_]\w*)', r'\1.__DOT__\2', content)
+    content = _RE_FQCN_DOT.sub(r'\1.__DOT__\2', content)
     
     # === 步骤 1.5: 额外保护未被FQCN覆盖的短类名（如 new game.e 中的 e）===
     # 构建需要保护的短类名集合（与成员名冲突的类名）
@@ -257,18 +556,17 @@ def deobfuscate_content(content, current_obf_full_class, class_map, member_map,
         for m in members:
             all_member_names.add(m['obf'])
     
-    short_class_placeholders = {}
     for obf_full, orig_full in class_map.items():
         obf_short = obf_full.split('.')[-1]
         # 仅当短类名与某个成员名冲突时才保护
         if obf_short in all_member_names and len(obf_short) <= 2:
             # 保护 new ClassName、extends ClassName 等后的短类名不被成员替换
-            placeholder = f'__SHORTCLS_{hash(obf_full) & 0xFFFFFF:06x}__'
+            placeholder = f'__SHORTCLS_{next(placeholder_seq):x}__'
             # 保护模式: new 包名.短类名(
-            pkg_pattern = re.escape('.'.join(obf_full.split('.')[:-1])) + r'\.' + re.escape(obf_short) + r'\b'
-            content = re.sub(pkg_pattern, '.'.join(obf_full.split('.')[:-1]) + '.' + placeholder, content)
+            pkg = '.'.join(obf_full.split('.')[:-1])
+            content = _pkg_short_class_re(pkg, obf_short).sub(pkg + '.' + placeholder, content)
             if placeholder in content:
-                short_class_placeholders[placeholder] = obf_short
+                placeholders[placeholder] = obf_short
 
     # === 步骤 2: 短类名替换 ===
     local_short_map = {}
@@ -297,154 +595,59 @@ def deobfuscate_content(content, current_obf_full_class, class_map, member_map,
             orig_short = class_map[full_obf].split('.')[-1]
             local_short_map[obf_short] = orig_short
 
-    # 按长度降序排列，避免子串替换问题
-    short_names = sorted(local_short_map.keys(), key=len, reverse=True)
-    for obf_s in short_names:
-        orig_s = local_short_map[obf_s]
-        if obf_s == orig_s:
-            continue
-        
-        # 在安全的上下文中替换短类名
-        pattern_pairs = [
-            # 类声明
-            (r'\bclass\s+' + re.escape(obf_s) + r'\b', f'class {orig_s}'),
-            (r'\bextends\s+' + re.escape(obf_s) + r'\b', f'extends {orig_s}'),
-            (r'\bimplements\s+' + re.escape(obf_s) + r'(?=[\s,{])', f'implements {orig_s}'),
-            (r'\binterface\s+' + re.escape(obf_s) + r'\b', f'interface {orig_s}'),
-            (r'\benum\s+' + re.escape(obf_s) + r'\b', f'enum {orig_s}'),
-            
-            # 对象创建
-            (r'\bnew\s+' + re.escape(obf_s) + r'\b', f'new {orig_s}'),
-            
-            # 类型转换
-            (r'\(\s*' + re.escape(obf_s) + r'\s*\)', f'({orig_s})'),
-            
-            # 访问修饰符 + 类型
-            (r'\bpublic\s+' + re.escape(obf_s) + r'\b', f'public {orig_s}'),
-            (r'\bprivate\s+' + re.escape(obf_s) + r'\b', f'private {orig_s}'),
-            (r'\bprotected\s+' + re.escape(obf_s) + r'\b', f'protected {orig_s}'),
-            (r'\bstatic\s+' + re.escape(obf_s) + r'\b', f'static {orig_s}'),
-            (r'\bfinal\s+' + re.escape(obf_s) + r'\b', f'final {orig_s}'),
-            (r'\babstract\s+' + re.escape(obf_s) + r'\b', f'abstract {orig_s}'),
-            
-            # 泛型
-            (r'<' + re.escape(obf_s) + r'>', f'<{orig_s}>'),
-            (r'<' + re.escape(obf_s) + r',', f'<{orig_s},'),
-            (r',\s*' + re.escape(obf_s) + r'>', f', {orig_s}>'),
-            (r'<\?\s+extends\s+' + re.escape(obf_s) + r'\b', f'<? extends {orig_s}'),
-            (r'<\?\s+super\s+' + re.escape(obf_s) + r'\b', f'<? super {orig_s}'),
-            
-            # .class 访问
-            (r'\b' + re.escape(obf_s) + r'\.class\b', f'{orig_s}.class'),
-            
-            # instanceof
-            (r'\binstanceof\s+' + re.escape(obf_s) + r'\b', f'instanceof {orig_s}'),
-            
-            # 变量声明 (Type varName)
-            (r'\b' + re.escape(obf_s) + r'\b(?=\s+\w+\s*[;=,\)])', f'{orig_s}'),
-            
-            # 数组类型
-            (r'\b' + re.escape(obf_s) + r'\b(?=\s*\[\s*\])', f'{orig_s}'),
-            
-            # 方法返回类型
-            (r'(?<=\s)' + re.escape(obf_s) + r'\b(?=\s+\w+\s*\()', f'{orig_s}'),
-            
-            # 参数类型
-            (r'(?<=\()\s*' + re.escape(obf_s) + r'\b(?=\s+\w)', f'{orig_s}'),
-            (r'(?<=,)\s*' + re.escape(obf_s) + r'\b(?=\s+\w)', f' {orig_s}'),
-        ]
-        
-        for p, r_val in pattern_pairs:
-            content = re.sub(p, r_val, content)
+    # 每个上下文只扫描一遍：所有待替换短类名合并为一个交替组（长名称优先）
+    rename_short = {
+        obf_s: orig_s for obf_s, orig_s in local_short_map.items()
+        if obf_s != orig_s and obf_s in content
+    }
+    if rename_short:
+        names_alt = '(' + '|'.join(
+            _re_escape(n) for n in sorted(rename_short, key=len, reverse=True)
+        ) + ')'
+        content = re.sub(
+            _SHORT_CLASS_KEYWORD_PREFIX + names_alt + r'\b',
+            lambda m: m.group(1) + ' ' + rename_short[m.group(2)],
+            content
+        )
+        for prefix, suffix, pre_repl, post_repl in _SHORT_CLASS_CONTEXTS:
+            content = re.sub(
+                prefix + names_alt + suffix,
+                lambda m, pre=pre_repl, post=post_repl: pre + rename_short[m.group(1)] + post,
+                content
+            )
 
     # === 步骤 2.5: 保护已替换的短类名避免后续被成员替换污染 ===
-    class_name_placeholders = {}
     for obf_s, orig_s in local_short_map.items():
         if obf_s != orig_s and len(orig_s) >= 2:  # 仅保护有意义的类名
-            placeholder = f'__CLASSNAME_{hash(orig_s) & 0xFFFFFF:06x}__'
+            placeholder = f'__CLASSNAME_{next(placeholder_seq):x}__'
+            orig_escaped = _re_escape(orig_s)
             # 仅在类型上下文中保护（避免保护字符串中的类名）
             # 保护模式: 点号后的类名（如 game.PlayerTeam）
-            content = re.sub(r'\.' + re.escape(orig_s) + r'\b', '.' + placeholder, content)
+            content = re.sub(r'\.' + orig_escaped + r'\b', '.' + placeholder, content)
             # 保护模式: new 后的类名
-            content = re.sub(r'\bnew\s+' + re.escape(orig_s) + r'\b', 'new ' + placeholder, content)
+            content = re.sub(r'\bnew\s+' + orig_escaped + r'\b', 'new ' + placeholder, content)
             # 保护模式: 类声明中的类名
-            content = re.sub(r'\bclass\s+' + re.escape(orig_s) + r'\b', 'class ' + placeholder, content)
+            content = re.sub(r'\bclass\s+' + orig_escaped + r'\b', 'class ' + placeholder, content)
             # 保护模式: extends/implements 后的类名
-            content = re.sub(r'\bextends\s+' + re.escape(orig_s) + r'\b', 'extends ' + placeholder, content)
-            content = re.sub(r'\bimplements\s+' + re.escape(orig_s) + r'\b', 'implements ' + placeholder, content)
+            content = re.sub(r'\bextends\s+' + orig_escaped + r'\b', 'extends ' + placeholder, content)
+            content = re.sub(r'\bimplements\s+' + orig_escaped + r'\b', 'implements ' + placeholder, content)
             if placeholder in content:
-                class_name_placeholders[placeholder] = orig_s
+                placeholders[placeholder] = orig_s
 
     # === 步骤 3: 成员替换（区分字段和方法）===
     # 注：高级类型处理已由 AST 引擎在上游完成，此处仅作回退
     
     if current_obf_full_class in member_map:
-        members = member_map[current_obf_full_class]
-        
-        # 分离方法和字段
-        methods = [m for m in members if m['is_method']]
-        fields = [m for m in members if not m['is_method']]
-        
-        # 方法去重：回退模式下只保留第一个
-        if type_index is None:
-            seen_method_obf = set()
-            unique_methods = []
-            for m in methods:
-                if m['obf'] not in seen_method_obf:
-                    seen_method_obf.add(m['obf'])
-                    unique_methods.append(m)
-            methods = unique_methods
+        method_renames, method_re, field_renames, field_re = \
+            _class_member_renames(member_map[current_obf_full_class])
         
         # 方法替换：仅在后跟 '(' 的上下文中替换
-        methods.sort(key=lambda x: len(x['obf']), reverse=True)
-        for m in methods:
-            obf_esc = re.escape(m['obf'])
-            # 方法调用模式：标识符后紧跟括号
-            # 避免替换类声明上下文
-            pattern = r'(?<![.\w])' + obf_esc + r'(?=\s*\()'
-            content = re.sub(pattern, m['orig'], content)
+        if method_renames:
+            content = method_re.sub(lambda mt: method_renames[mt.group(0)], content)
         
         # 字段替换：排除方法调用上下文
-        fields.sort(key=lambda x: len(x['obf']), reverse=True)
-        for m in fields:
-            obf_esc = re.escape(m['obf'])
-            
-            # 模式 1: this.field 或 obj.field (点号后)
-            pattern1 = r'(?<=\.)' + obf_esc + r'\b(?!\s*\()'
-            content = re.sub(pattern1, m['orig'], content)
-            
-            # 模式 2: 字段赋值/使用
-            # 排除类声明关键字后的位置
-            protected_prefixes = (
-                r'(?<!\bclass\s)'
-                r'(?<!\bextends\s)'
-                r'(?<!\bimplements\s)'
-                r'(?<!\bnew\s)'
-                r'(?<!\bpublic\s)'
-                r'(?<!\bprivate\s)'
-                r'(?<!\bprotected\s)'
-                r'(?<!\binterface\s)'
-                r'(?<!\benum\s)'
-                r'(?<!\bstatic\s)'
-                r'(?<!\bfinal\s)'
-                r'(?<!\bvoid\s)'
-                r'(?<!\bint\s)'
-                r'(?<!\blong\s)'
-                r'(?<!\bfloat\s)'
-                r'(?<!\bdouble\s)'
-                r'(?<!\bboolean\s)'
-                r'(?<!\bbyte\s)'
-                r'(?<!\bchar\s)'
-                r'(?<!\bshort\s)'
-            )
-            
-            # 独立字段访问（在赋值、分号、逗号等结束符前）
-            pattern2 = protected_prefixes + r'\b' + obf_esc + r'\b(?=\s*[=;,\)\]])'
-            content = re.sub(pattern2, m['orig'], content)
-            
-            # 数组索引访问
-            pattern3 = protected_prefixes + r'\b' + obf_esc + r'\b(?=\s*\[)'
-            content = re.sub(pattern3, m['orig'], content)
+        if field_renames:
+            content = field_re.sub(lambda mt: field_renames[mt.group(0)], content)
 
     # === 步骤 3 已移除: 原兜底正则替换逻辑过于激进 ===
     # Tree-sitter 解析器已处理绝大多数情况，此兜底逻辑导致：
@@ -458,57 +661,51 @@ def deobfuscate_content(content, current_obf_full_class, class_map, member_map,
         # 提取方法声明模式: 返回类型 方法名()
         # 注意: 排除 FQCN 中的短类名（如 game.e(...)中的e是类名不是方法名）
         # 方法声明必须有 "类型 空格 方法名" 的形式,且方法名前不能是点号
-        method_decl_pattern = re.compile(r'\b(int|boolean|void|float|double|long|short|byte|char|[A-Z][a-zA-Z0-9_]*)\s+([a-z][a-zA-Z0-9]?)\s*\(')
+        # 单次 sub 扫描，回调中只改写方法名所在片段
+        method_by_signature = getattr(index, 'method_by_signature', None)
+        global_method_fallback = index.global_method_fallback
         
-        # 收集所有匹配并从后往前替换（避免索引偏移）
-        matches = list(method_decl_pattern.finditer(content))
-        for match in reversed(matches):
+        def replace_method_decl(match):
             ret_type = match.group(1)
             obf_m = match.group(2)
             
             # 跳过 FQCN 中的短类名（返回类型包含点号说明是包名而非简单类型）
             if '.' in ret_type:
-                continue
+                return match.group(0)
             
             # 优先使用基于签名的精确回退
             sig_key = (obf_m, ret_type)
-            if hasattr(index, 'method_by_signature') and sig_key in index.method_by_signature:
-                fallback_name = index.method_by_signature[sig_key]
-            elif obf_m in index.global_method_fallback:
-                fallback_name = index.global_method_fallback[obf_m]
+            if method_by_signature is not None and sig_key in method_by_signature:
+                fallback_name = method_by_signature[sig_key]
+            elif obf_m in global_method_fallback:
+                fallback_name = global_method_fallback[obf_m]
             else:
-                continue
+                return match.group(0)
             
-            # 仅替换此特定位置
-            start, end = match.start(2), match.end(2)
-            content = content[:start] + fallback_name + content[end:]
+            # 仅替换方法名部分
+            text = match.group(0)
+            base = match.start()
+            return text[:match.start(2) - base] + fallback_name + text[match.end(2) - base:]
+        
+        content = _RE_METHOD_DECL.sub(replace_method_decl, content)
 
     # === 步骤 4: 修复 package 声明 ===
     if current_obf_full_class in class_map:
         new_full_name = class_map[current_obf_full_class]
         new_package = '.'.join(new_full_name.split('.')[:-1])
-        content = re.sub(r'^package\s+[\w\.]+;', f'package {new_package};', content, flags=re.MULTILINE)
+        content = _RE_PACKAGE.sub(f'package {new_package};', content)
     
     # === 步骤 4.5: 恢复全限定类名占位符 ===
     # 先恢复内部保护的点
     content = content.replace('.__DOT__', '.')
-    for placeholder, original in fqcn_placeholders.items():
-        content = content.replace(placeholder, original)
-    
-    # 恢复步骤 2.5 中保护的短类名
-    for placeholder, orig_class in class_name_placeholders.items():
-        content = content.replace(placeholder, orig_class)
-    
-    # 恢复步骤 1.5 中保护的短类名（冲突保护）
-    for placeholder, orig_short in short_class_placeholders.items():
-        content = content.replace(placeholder, orig_short)
     
-    # 恢复步骤 0.6 中预保护的 FQCN 短类名
-    for placeholder, orig_short in fqcn_shortname_placeholders.items():
-        content = content.replace(placeholder, orig_short)
+    # 一次扫描恢复全部类名占位符：全限定类名（步骤 1）、已替换短类名（步骤 2.5）、
+    # 冲突保护短类名（步骤 1.5）、FQCN 预保护短类名（步骤 0.6）；各类占位符前缀不同，互不冲突
+    if placeholders:
+        content = _RE_CLASS_PLACEHOLDER.sub(lambda m: placeholders.get(m.group(0), m.group(0)), content)
 
     # === 步骤 5: 恢复字符串字面量 ===
-    content = restore_strings(content, string_map)
+    content = restore_strings(content, strings)
     
     # === 步骤 5.5: 反射字符串处理 ===
     # 1. Class.forName("obf.class.name") -> Class.forName("orig.class.name")
@@ -518,11 +715,7 @@ def deobfuscate_content(content, current_obf_full_class, class_map, member_map,
             return f'Class.forName("{class_map[class_str]}")'
         return m.group(0)
     
-    content = re.sub(
-        r'Class\.forName\s*\(\s*"([^"]+)"\s*\)',
-        replace_forname_class,
-        content
-    )
+    content = _RE_FORNAME.sub(replace_forname_class, content)
     
     # 2. getMethod/getDeclaredMethod("methodName") -> ("origMethodName")
     def replace_method_string(m):
@@ -540,11 +733,7 @@ def deobfuscate_content(content, current_obf_full_class, class_map, member_map,
                     return f'{call_type}("{member["orig"]}"'
         return m.group(0)
     
-    content = re.sub(
-        r'(getMethod|getDeclaredMethod)\s*\(\s*"(\w+)"',
-        replace_method_string,
-        content
-    )
+    content = _RE_GET_METHOD.sub(replace_method_string, content)
     
     # === 步骤 6: Smali 回退处理（针对反编译失败的方法）===
     content = inject_smali_for_failed_methods(content, current_obf_full_class)
@@ -552,9 +741,296 @@ def deobfuscate_content(content, current_obf_full_class, class_map, member_map,
     return content
 
 
-def process_merged_files(input_root, output_root, class_map, member_map, use_advanced=True, java_files_to_process=None):
+# ==================== 单文件处理 ====================
+
+def _iter_merged_parts(file_path):
+    """
+    按 _RE_FILE_DELIMITER.split 的顺序逐个产出合并文件的片段:
+    前导内容, 分隔符, 相对路径, 代码段, 分隔符, 相对路径, 代码段, ...
+    
+    文件经 mmap 映射后在字节上定位分隔符，每次只解码一个片段，
+    不再把整个合并文件解码为 str 再 split 复制一遍。
+    含 '\\r' 的文件需要文本模式的换行符转换，回退为整体解码。
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield ''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b'\r') != -1:
+                content = mm[:].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                yield from _RE_FILE_DELIMITER.split(content)
+                return
+            
+            pos = 0
+            for match in _RE_FILE_DELIMITER_BYTES.finditer(mm):
+                yield mm[pos:match.start()].decode('utf-8')
+                yield match.group(1).decode('utf-8')
+                yield match.group(2).decode('utf-8')
+                pos = match.end()
+            yield mm[pos:].decode('utf-8')
+
+
+def _process_one_file(root, file, input_root, output_root, context):
+    """
+    处理单个输入文件（合并的 .txt 或单个 .java），写出结果文件
+    
+    合并文件逐段读取、逐段写出，内存中只保留当前代码段
+    
+    Args:
+        context: class_map / member_map / sorted_obf_classes / type_index /
+                 ast_deobfuscator / enhancer
+    
+    Returns:
+        本文件的 AST 处理统计 {'ast_success', 'ast_fallback', 'fallback_reasons'}
+    """
+    class_map = context['class_map']
+    member_map = context['member_map']
+    sorted_obf_classes = context['sorted_obf_classes']
+    type_index = context['type_index']
+    ast_deobfuscator = context['ast_deobfuscator']
+    enhancer = context['enhancer']
+    
+    stats = {
+        'ast_success': 0,
+        'ast_fallback': 0,
+        'fallback_reasons': {}
+    }
+    is_merged = file.endswith('.txt')
+    
+    file_path = os.path.join(root, file)
+    rel_dir = os.path.relpath(root, input_root)
+    
+    def process_segment(delimiter_full, obf_rel_path, code_segment):
+        """处理一个代码段，返回 (分隔符 + 处理后代码, 匹配到的混淆类名)"""
+        # 预处理：过滤 JADX 注释
+        code_segment = filter_jadx_comments(code_segment)
+        
+        tmp_path = obf_rel_path
+        if tmp_path.startswith('./'):
+            tmp_path = tmp_path[2:]
+        current_obf_full_class = tmp_path.replace('/', '.').replace('.java', '')
+        
+        # 匹配混淆类
+        matched_obf_class = None
+        if current_obf_full_class in class_map:
+            matched_obf_class = current_obf_full_class
+        else:
+            for obf_name in sorted_obf_classes:
+                if obf_name.endswith(current_obf_full_class):
+                    matched_obf_class = obf_name
+                    break
+        
+        if not matched_obf_class:
+            matched_obf_class = current_obf_full_class
+
+        # === AST-First 处理流程 ===
+        processed_segment = None
+        
+        if ast_deobfuscator:
+            try:
+                # 使用 AST 引擎直接处理原始代码（无预处理）
+                processed_segment = ast_deobfuscator.process(code_segment, matched_obf_class)
+                
+                # 补充处理：package 声明修复
+                if matched_obf_class in class_map:
+                    new_full_name = class_map[matched_obf_class]
+                    new_package = '.'.join(new_full_name.split('.')[:-1])
+                    processed_segment = _RE_PACKAGE.sub(
+                        f'package {new_package};',
+                        processed_segment
+                    )
+                stats['ast_success'] += 1
+            except Exception as e:
+                # AST 解析失败，回退到正则处理
+                processed_segment = None
+                stats['ast_fallback'] += 1
+                reason = str(e)[:50]
+                stats['fallback_reasons'][reason] = stats['fallback_reasons'].get(reason, 0) + 1
+        
+        # 回退：使用正则处理流程
+        if processed_segment is None:
+            processed_segment = deobfuscate_content(
+                code_segment, matched_obf_class, class_map, member_map, 
+                sorted_obf_classes, type_index
+            )
+        
+        # 应用启发式命名增强
+        if enhancer:
+            processed_segment = enhancer.enhance(processed_segment, matched_obf_class)
+        
+        if matched_obf_class in class_map:
+            new_rel_path = class_map[matched_obf_class].replace('.', '/') + '.java'
+        else:
+            new_rel_path = obf_rel_path
+        
+        new_delimiter = delimiter_full.replace(obf_rel_path, new_rel_path)
+        return new_delimiter + processed_segment, matched_obf_class
+
+    if is_merged:
+        # 合并文件：输出文件名已知，边读边写
+        output_file_name = file.replace('.txt', '_processed.txt')
+        output_file_path = os.path.join(output_root, rel_dir, output_file_name)
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        
+        parts = _iter_merged_parts(file_path)
+        with open(output_file_path, 'w', encoding='utf-8') as f:
+            f.write(next(parts))
+            for delimiter_full in parts:
+                obf_rel_path = next(parts)
+                code_segment = next(parts)
+                f.write(process_segment(delimiter_full, obf_rel_path, code_segment)[0])
+        return stats
+    
+    # 单个 .java 文件：按匹配到的类名决定输出文件名
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    rel_path = os.path.relpath(file_path, input_root)
+    processed_content, matched_obf_class = process_segment("", rel_path, content)
+    
+    if matched_obf_class in class_map:
+        output_file_name = class_map[matched_obf_class].split('.')[-1] + '.java'
+    else:
+        output_file_name = file
+    
+    output_file_path = os.path.join(output_root, rel_dir, output_file_name)
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    
+    with open(output_file_path, 'w', encoding='utf-8') as f:
+        f.write(processed_content)
+    
+    return stats
+
+
+def _merge_file_stats(stats, file_stats):
+    """将各文件的 AST 处理统计累加到总统计"""
+    for fs in file_stats:
+        stats['ast_success'] += fs['ast_success']
+        stats['ast_fallback'] += fs['ast_fallback']
+        for reason, count in fs['fallback_reasons'].items():
+            stats['fallback_reasons'][reason] = stats['fallback_reasons'].get(reason, 0) + count
+
+
+# 工作进程内的处理上下文，由 initializer 构建
+_worker_context = None
+
+
+def _init_file_worker(class_map, member_map, sorted_obf_classes, type_index):
+    """工作进程初始化: 构建本进程的 AST 引擎与增强器"""
+    global _worker_context
+    if type_index is not None:
+        # 让本进程内 get_global_type_index() 返回同一份索引
+        set_global_type_index(type_index)
+    _worker_context = {
+        'class_map': class_map,
+        'member_map': member_map,
+        'sorted_obf_classes': sorted_obf_classes,
+        'type_index': type_index,
+        'ast_deobfuscator': (
+            create_ast_deobfuscator(class_map, member_map, type_index)
+            if type_index is not None else None
+        ),
+        'enhancer': create_enhancer(class_map, member_map) if ENHANCER_AVAILABLE else None,
+    }
+
+
+def _init_file_worker_from_shm(shm_name, size):
+    """工作进程初始化（非 fork 启动）: 从共享内存反序列化映射表与类型索引"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        class_map, member_map, sorted_obf_classes, type_index = pickle.loads(shm.buf[:size])
+    finally:
+        shm.close()
+    _init_file_worker(class_map, member_map, sorted_obf_classes, type_index)
+
+
+def _process_file_task(task):
+    """进程池任务: task = (root, file, input_root, output_root)"""
+    root, file, input_root, output_root = task
+    return _process_one_file(root, file, input_root, output_root, _worker_context)
+
+
+# ==================== 继承索引预扫描 ====================
+
+_scan_parser = None
+
+
+def _init_scan_worker():
+    """预扫描工作进程初始化: Tree-sitter 解析器不可序列化，每个进程各自构建"""
+    global _scan_parser
+    _scan_parser = TreeSitterJavaParser()
+
+
+def _scan_class_headers(file_path):
+    """
+    预扫描任务: 解析单个文件中各个类的声明头部
+    
+    Returns:
+        [(类名, 父类, [接口, ...]), ...]，按文件内出现顺序
+    """
+    # Tree-sitter 原生解析注释，无需先过滤 JADX 注释；只需类声明头部信息
+    if not file_path.endswith('.txt'):
+        # 单个源文件直接按字节交给 Tree-sitter，不做文本解码
+        try:
+            info = _scan_parser.extract_class_header_file(file_path)
+        except (OSError, UnicodeDecodeError):
+            return []
+        return [(info.class_name, info.parent_class, info.interfaces)] if info.class_name else []
+    
+    # 合并文件逐段读取，只取代码段
+    parts = _iter_merged_parts(file_path)
+    headers = []
+    for i, seg in enumerate(parts):
+        if not i or i % 3:
+            continue
+        try:
+            info = _scan_parser.extract_class_header(seg)
+        except (OSError, UnicodeDecodeError):
+            continue
+        if info.class_name:
+            headers.append((info.class_name, info.parent_class, info.interfaces))
+    return headers
+
+
+def _scan_inheritance(input_root, type_index, max_workers):
+    """全量预扫描输入目录，把类的父类与接口关系写入 type_index（文件多时用进程池并行解析）"""
+    scan_files = [
+        os.path.join(root, file)
+        for root, dirs, files in os.walk(input_root)
+        for file in files
+        if (file.endswith('.txt') or file.endswith('.java')) and not file.startswith('.')
+    ]
+    
+    def apply_headers(file_headers):
+        # 按文件顺序合并，与串行扫描的写入顺序一致
+        for headers in file_headers:
+            for class_name, parent_class, interfaces in headers:
+                if parent_class:
+                    type_index.set_inheritance(class_name, parent_class)
+                # 记录所有接口继承关系
+                for itf in interfaces:
+                    type_index.set_inheritance(class_name, itf)
+    
+    if max_workers <= 1 or len(scan_files) <= 1:
+        _init_scan_worker()
+        apply_headers(map(_scan_class_headers, scan_files))
+        return
+    
+    with ProcessPoolExecutor(
+        max_workers=min(max_workers, len(scan_files)),
+        initializer=_init_scan_worker
+    ) as executor:
+        apply_headers(executor.map(_scan_class_headers, scan_files, chunksize=16))
+
+
+def process_merged_files(input_root, output_root, class_map, member_map, use_advanced=True, java_files_to_process=None,
+                         max_workers=None):
     """
     处理所有文件。
+    
+    继承索引预扫描与之后的逐文件处理都按文件分发到进程池并行执行（max_workers 默认为 CPU 核数，
+    <= 1 或仅一个文件时串行处理）。
     """
     sorted_obf_classes = sorted(class_map.keys(), key=len, reverse=True)
     
@@ -570,6 +1046,7 @@ def process_merged_files(input_root, output_root, class_map, member_map, use_adv
     elif use_advanced:
         print("  - 警告: AST 引擎不可用，使用基础替换")
 
+    enhancer = None
     if ENHANCER_AVAILABLE:
         enhancer = create_enhancer(class_map, member_map)
         unmapped_collector = UnmappedCollector()
@@ -582,155 +1059,87 @@ def process_merged_files(input_root, output_root, class_map, member_map, use_adv
         'fallback_reasons': {}
     }
     
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    
     # === 预扫描阶段: 构建继承树 ===
     if type_index:
         print("正在进行全量预扫描以构建继承关系索引...")
-        scanner = TreeSitterJavaParser()
-        for root, dirs, files in os.walk(input_root):
-            for file in files:
-                if (file.endswith('.txt') or file.endswith('.java')) and not file.startswith('.'):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        text = f.read()
-                    
-                    segments = []
-                    if file.endswith('.txt'):
-                        pts = re.split(r'(=+\n// FILE_PATH: (.+?)\n=+)', text)
-                        segments = [pts[i] for i in range(3, len(pts), 3)]
-                    else:
-                        segments = [text]
-                    
-                    for seg in segments:
-                        try:
-                            # 预处理：过滤注释
-                            seg_clean = filter_jadx_comments(seg)
-                            info = scanner.extract_type_info(seg_clean)
-                            if info.class_name:
-                                if info.parent_class:
-                                    type_index.set_inheritance(info.class_name, info.parent_class)
-                                # 记录所有接口继承关系
-                                for itf in info.interfaces:
-                                    type_index.set_inheritance(info.class_name, itf)
-                        except:
-                            continue
+        _scan_inheritance(input_root, type_index, max_workers)
         print("  - 继承索引构建完成")
 
-    processed_count = 0
-    
+    # 收集待处理文件
+    file_tasks = []
     for root, dirs, files in os.walk(input_root):
         for file in files:
             file_abs_path = os.path.join(root, file)
             # 调试限制
             if java_files_to_process and file_abs_path not in java_files_to_process:
                 continue
-                
-            is_merged = file.endswith('.txt')
-            is_java = file.endswith('.java')
-            
-            if (is_merged or is_java) and not file.startswith('.'):
-                file_path = os.path.join(root, file)
-                rel_dir = os.path.relpath(root, input_root)
-                
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                if is_merged:
-                    delimiter_pattern = r'(=+\n// FILE_PATH: (.+?)\n=+)'
-                    parts = re.split(delimiter_pattern, content)
-                else:
-                    # 对于单个 .java 文件，构造一个伪零件列表以复用逻辑
-                    rel_path = os.path.relpath(file_path, input_root)
-                    parts = ["", "", rel_path, content]
-                
-                processed_content = parts[0]
-                
-                for i in range(1, len(parts), 3):
-                    delimiter_full = parts[i]
-                    obf_rel_path = parts[i+1]
-                    code_segment = parts[i+2]
-                    
-                    # 预处理：过滤 JADX 注释
-                    code_segment = filter_jadx_comments(code_segment)
-                    
-                    tmp_path = obf_rel_path
-                    if tmp_path.startswith('./'):
-                        tmp_path = tmp_path[2:]
-                    current_obf_full_class = tmp_path.replace('/', '.').replace('.java', '')
-                    
-                    # 匹配混淆类
-                    matched_obf_class = None
-                    if current_obf_full_class in class_map:
-                        matched_obf_class = current_obf_full_class
-                    else:
-                        for obf_name in sorted_obf_classes:
-                            if obf_name.endswith(current_obf_full_class):
-                                matched_obf_class = obf_name
-                                break
-                    
-                    if not matched_obf_class:
-                        matched_obf_class = current_obf_full_class
-
-                    # === AST-First 处理流程 ===
-                    processed_segment = None
-                    
-                    if ast_deobfuscator:
-                        try:
-                            # 使用 AST 引擎直接处理原始代码（无预处理）
-                            processed_segment = ast_deobfuscator.process(code_segment, matched_obf_class)
-                            
-                            # 补充处理：package 声明修复
-                            if matched_obf_class in class_map:
-                                new_full_name = class_map[matched_obf_class]
-                                new_package = '.'.join(new_full_name.split('.')[:-1])
-                                processed_segment = re.sub(
-                                    r'^package\s+[\w\.]+;', 
-                                    f'package {new_package};', 
-                                    processed_segment, 
-                                    flags=re.MULTILINE
-                                )
-                            stats['ast_success'] += 1
-                        except Exception as e:
-                            # AST 解析失败，回退到正则处理
-                            processed_segment = None
-                            stats['ast_fallback'] += 1
-                            reason = str(e)[:50]
-                            stats['fallback_reasons'][reason] = stats['fallback_reasons'].get(reason, 0) + 1
-                    
-                    # 回退：使用正则处理流程
-                    if processed_segment is None:
-                        processed_segment = deobfuscate_content(
-                            code_segment, matched_obf_class, class_map, member_map, 
-                            sorted_obf_classes, type_index
-                        )
-                    
-                    # 应用启发式命名增强
-                    if enhancer:
-                        processed_segment = enhancer.enhance(processed_segment, matched_obf_class)
-                    
-                    if matched_obf_class in class_map:
-                        new_rel_path = class_map[matched_obf_class].replace('.', '/') + '.java'
-                    else:
-                        new_rel_path = obf_rel_path
-                    
-                    new_delimiter = delimiter_full.replace(obf_rel_path, new_rel_path)
-                    processed_content += new_delimiter + processed_segment
-
-                # 决定输出文件名和路径
-                if is_merged:
-                    output_file_name = file.replace('.txt', '_processed.txt')
-                else:
-                    if matched_obf_class in class_map:
-                        output_file_name = class_map[matched_obf_class].split('.')[-1] + '.java'
-                    else:
-                        output_file_name = file
-                
-                output_file_path = os.path.join(output_root, rel_dir, output_file_name)
-                os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-                
-                with open(output_file_path, 'w', encoding='utf-8') as f:
-                    f.write(processed_content)
-                
-                processed_count += 1
+            if (file.endswith('.txt') or file.endswith('.java')) and not file.startswith('.'):
+                file_tasks.append((root, file))
+    
+    if max_workers <= 1 or len(file_tasks) <= 1:
+        context = {
+            'class_map': class_map,
+            'member_map': member_map,
+            'sorted_obf_classes': sorted_obf_classes,
+            'type_index': type_index,
+            'ast_deobfuscator': ast_deobfuscator,
+            'enhancer': enhancer,
+        }
+        file_stats = (
+            _process_one_file(root, file, input_root, output_root, context)
+            for root, file in file_tasks
+        )
+        _merge_file_stats(stats, file_stats)
+    else:
+        # 文件间相互独立：映射表与类型索引经 initializer 每个进程只传输一次
+        # fork 启动时子进程直接继承父进程内存；spawn 等方式下 initargs 会为每个进程各序列化一次，
+        # 改为序列化一次写入共享内存，各进程从共享内存反序列化
+        # Linux 上显式使用 fork（Python 3.14 起默认改为 forkserver），保证写时复制共享
+        shm = None
+        if sys.platform.startswith('linux'):
+            mp_context = multiprocessing.get_context('fork')
+        else:
+            mp_context = multiprocessing.get_context()
+        forked = mp_context.get_start_method() == 'fork'
+        if forked:
+            initializer = _init_file_worker
+            initargs = (class_map, member_map, sorted_obf_classes, type_index)
+            # 冻结现有对象：子进程中的 GC 不再改写这些对象的头部，索引所在内存页保持共享
+            gc.freeze()
+        else:
+            payload = pickle.dumps(
+                (class_map, member_map, sorted_obf_classes, type_index),
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+            shm = shared_memory.SharedMemory(create=True, size=len(payload))
+            shm.buf[:len(payload)] = payload
+            initializer = _init_file_worker_from_shm
+            initargs = (shm.name, len(payload))
+            del payload
+        
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(file_tasks)),
+                mp_context=mp_context,
+                initializer=initializer,
+                initargs=initargs
+            ) as executor:
+                file_stats = executor.map(
+                    _process_file_task,
+                    [(root, file, input_root, output_root) for root, file in file_tasks]
+                )
+                _merge_file_stats(stats, file_stats)
+        finally:
+            if forked:
+                gc.unfreeze()
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+    
+    processed_count = len(file_tasks)
     
     # 输出 AST 处理统计
     if ast_deobfuscator and (stats['ast_success'] > 0 or stats['ast_fallback'] > 0):
@@ -13,11 +13,17 @@ Smali 增强反混淆模块 (v2.0)
 
 import os
 import re
+import sys
+import mmap
 import argparse
 from typing import Dict, List, Tuple, Optional, Set
 from dataclasses import dataclass, field
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# JVM 描述符解析 (独立模块，可用 mypyc 编译，见 jvm_descriptor 模块说明)
+from jvm_descriptor import JVM_TYPE_MAP, JVM_TYPE_TOKEN, parse_jvm_type, parse_method_descriptor
 
 # Android SDK 接口映射器
 try:
@@ -46,7 +52,11 @@ CONFIG = get_config()
 
 # ==================== 数据结构 ====================
 
-@dataclass
+# Python 3.10+ 使用 slots 数据类，去掉每个实例的 __dict__（_smali_cache 中常驻大量实例）
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class SmaliMethod:
     """Smali 方法信息"""
     name: str
@@ -60,7 +70,7 @@ class SmaliMethod:
     is_synthetic: bool = False
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class SmaliClass:
     """Smali 类信息"""
     class_name: str
@@ -72,180 +82,140 @@ class SmaliClass:
     is_abstract: bool = False
 
 
-# ==================== JVM 类型解析 ====================
-
-JVM_TYPE_MAP = {
-    'V': 'void', 'Z': 'boolean', 'B': 'byte', 'C': 'char',
-    'S': 'short', 'I': 'int', 'J': 'long', 'F': 'float', 'D': 'double'
-}
-
-
-def parse_jvm_type(desc: str) -> Tuple[str, bool]:
-    """
-    解析 JVM 类型描述符为 Java 类型
-    
-    Returns:
-        (类型名, 是否解析成功)
-    """
-    if not desc:
-        return 'void', True
-    
-    # 基本类型
-    if desc in JVM_TYPE_MAP:
-        return JVM_TYPE_MAP[desc], True
-    
-    # 数组类型
-    if desc.startswith('['):
-        element_type, success = parse_jvm_type(desc[1:])
-        if not success:
-            return f'<invalid_array:{desc}>', False
-        return element_type + '[]', True
-    
-    # 对象类型 L...;
-    if desc.startswith('L') and desc.endswith(';'):
-        full_name = desc[1:-1].replace('/', '.')
-        # 处理无包名的类 (如 La;)
-        if '.' not in full_name:
-            return full_name, True
-        return full_name.split('.')[-1], True
-    
-    # 非法描述符
-    return f'<invalid:{desc}>', False
+@dataclass(**_DATACLASS_OPTIONS)
+class MemberMapping:
+    """member_map 中单条方法映射的规范化形式 (映射器内部索引使用，字符串已 intern)"""
+    obf: str
+    orig: str
+    descriptor: str = ''
+    signature: str = ''
+    return_type: str = 'void'
 
 
-def parse_method_descriptor(descriptor: str) -> Tuple[List[str], str, bool]:
-    """
-    解析方法描述符
-    
-    Returns:
-        (参数类型列表, 返回类型, 是否解析成功)
-    """
-    if not descriptor or not descriptor.startswith('('):
-        return [], 'void', False
-    
-    try:
-        paren_end = descriptor.index(')')
-    except ValueError:
-        return [], '<invalid_descriptor>', False
-    
-    params_part = descriptor[1:paren_end]
-    return_part = descriptor[paren_end + 1:]
-    
-    # 解析参数
-    params = []
-    i = 0
-    parse_success = True
-    
-    while i < len(params_part):
-        char = params_part[i]
-        
-        if char in JVM_TYPE_MAP:
-            params.append(JVM_TYPE_MAP[char])
-            i += 1
-        elif char == 'L':
-            try:
-                end = params_part.index(';', i)
-                type_name, success = parse_jvm_type(params_part[i:end + 1])
-                if not success:
-                    parse_success = False
-                params.append(type_name)
-                i = end + 1
-            except ValueError:
-                # 找不到分号，描述符非法
-                params.append(f'<truncated:{params_part[i:]}>')
-                parse_success = False
-                break
-        elif char == '[':
-            # 数组类型
-            array_depth = 0
-            while i < len(params_part) and params_part[i] == '[':
-                array_depth += 1
-                i += 1
-            if i >= len(params_part):
-                params.append('<incomplete_array>')
-                parse_success = False
-                break
-            
-            if params_part[i] == 'L':
-                try:
-                    end = params_part.index(';', i)
-                    base_type, success = parse_jvm_type(params_part[i:end + 1])
-                    if not success:
-                        parse_success = False
-                    i = end + 1
-                except ValueError:
-                    base_type = f'<truncated:{params_part[i:]}>'
-                    parse_success = False
-                    break
-            elif params_part[i] in JVM_TYPE_MAP:
-                base_type = JVM_TYPE_MAP[params_part[i]]
-                i += 1
-            else:
-                # 非法字符
-                base_type = f'<invalid_base:{params_part[i]}>'
-                parse_success = False
-                i += 1
-            params.append(base_type + '[]' * array_depth)
-        else:
-            # 非法字符 - 不在 JVM_TYPE_MAP 且不是 L 或 [
-            params.append(f'<invalid_char:{char}>')
-            parse_success = False
-            i += 1
-    
-    # 解析返回类型
-    return_type, ret_success = parse_jvm_type(return_part)
-    if not ret_success:
-        parse_success = False
-    
-    # 日志警告：非法描述符可能由混淆器故意插入
-    if not parse_success:
-        import sys
-        print(f"Warning: Failed to parse method descriptor: {descriptor}", file=sys.stderr)
-    
-    return params, return_type, parse_success
+def _normalize_method_mapping(m: dict) -> MemberMapping:
+    """将 member_map 中的方法条目 (dict) 转换为 MemberMapping"""
+    return MemberMapping(
+        obf=sys.intern(m['obf']),
+        orig=m['orig'],
+        descriptor=sys.intern(m.get('descriptor') or ''),
+        signature=m.get('signature') or '',
+        return_type=m.get('return_type', 'void'),
+    )
 
 
 # ==================== Smali 解析器 (增强版) ====================
+# smali 指令与修饰符均为小写且区分大小写，正则不使用 re.IGNORECASE
 
 # 方法修饰符模式
-METHOD_MODIFIERS = r'(?:public|private|protected|static|final|abstract|synchronized|native|bridge|synthetic|varargs|strictfp|declared-synchronized)*'
+_MODIFIER_KEYWORDS = r'public|private|protected|static|final|abstract|synchronized|native|bridge|synthetic|varargs|strictfp|declared-synchronized'
+METHOD_MODIFIERS = r'(?:' + _MODIFIER_KEYWORDS + r')*'
 
-# 方法声明正则 - 更宽松的匹配
-METHOD_PATTERN = re.compile(
-    r'\.method\s+(' + METHOD_MODIFIERS + r')\s*(\S+)\(([^)]*)\)(\S+)',
-    re.IGNORECASE
-)
+# 方法修饰符 -> 标志位
+MOD_STATIC = 1
+MOD_ABSTRACT = 2
+MOD_BRIDGE = 4
+MOD_SYNTHETIC = 8
+_MOD_FLAGS = {
+    'static': MOD_STATIC,
+    'abstract': MOD_ABSTRACT,
+    'bridge': MOD_BRIDGE,
+    'synthetic': MOD_SYNTHETIC,
+}
 
-# 备用方法正则 - 处理极端情况
+# 备用方法正则 - 处理 _parse_method_line 无法切分的极端情况
 METHOD_PATTERN_FALLBACK = re.compile(
-    r'\.method\s+.*?([a-zA-Z_$<>][\w$<>]*)\(([^)]*)\)([^\s]+)',
-    re.IGNORECASE
+    r'\.method\s+.*?([a-zA-Z_$<>][\w$<>]*)\(([^)]*)\)([^\s]+)'
 )
 
 # 类声明正则
 CLASS_PATTERN = re.compile(
-    r'\.class\s+(' + METHOD_MODIFIERS + r')\s*(interface\s+)?(\S+)',
-    re.IGNORECASE
+    r'\.class\s+(' + METHOD_MODIFIERS + r')\s*(interface\s+)?(\S+)'
 )
 
 # 字段正则 - 更宽松
 FIELD_PATTERN = re.compile(
-    r'\.field\s+(' + METHOD_MODIFIERS + r')\s*(\S+):(\S+)',
-    re.IGNORECASE
+    r'\.field\s+(' + METHOD_MODIFIERS + r')\s*(\S+):(\S+)'
 )
 
+# 父类 / 接口声明
+SUPER_PATTERN = re.compile(r'\.super\s+(\S+)')
+IMPLEMENTS_PATTERN = re.compile(r'\.implements\s+(\S+)')
+
+# 声明行扫描: 一次 finditer 只取出 .class/.super/.implements/.method/.field 开头的行，
+# 方法体指令行在正则引擎内被跳过；group(1) 为去除行首空白后的整行，group(2) 为指令名
+# 直接作用于文件的原始字节，只有命中的声明行才解码为 str
+DIRECTIVE_LINE_PATTERN = re.compile(
+    rb'^[^\S\n]*(\.(class|super|implements|method|field)[^\n]*)',
+    re.MULTILINE
+)
+
+
+def _parse_method_line(line: str) -> Optional[Tuple[Set[str], str, str, str]]:
+    """
+    解析 .method 声明行
+    
+    smali 方法声明格式固定为 `.method 修饰符* 名称(参数)返回类型`，按空白切分即可，
+    无需正则回溯；格式不符时返回 None，由 METHOD_PATTERN_FALLBACK 兜底
+    
+    Returns:
+        (修饰符集合, 方法名, 参数描述符, 返回描述符)
+    """
+    tokens = line.split()
+    if not tokens or tokens[0] != '.method':
+        return None
+    
+    for index in range(1, len(tokens)):
+        token = tokens[index]
+        paren = token.find('(')
+        if paren < 0:
+            continue
+        close = token.find(')', paren)
+        if paren == 0 or close < 0 or close == len(token) - 1:
+            return None
+        return set(tokens[1:index]), token[:paren], token[paren + 1:close], token[close + 1:]
+    
+    return None
+
+
+# 超过该大小的 smali 文件以只读 mmap 方式扫描，避免整文件复制到堆上
+SMALI_MMAP_THRESHOLD = 64 * 1024
+
 
 def parse_smali_file(smali_path: str) -> Optional[SmaliClass]:
     """解析 smali 文件 (增强版)"""
     if not os.path.exists(smali_path):
         return None
     
+    mapped = None
     try:
-        with open(smali_path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+        with open(smali_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= SMALI_MMAP_THRESHOLD:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                content = f.read()
     except Exception:
         return None
     
+    if mapped is not None:
+        with mapped:
+            if mapped.find(b'\r') == -1:
+                return _parse_smali_content(mapped)
+            content = mapped[:]
+    
+    return parse_smali_bytes(content)
+
+
+def parse_smali_bytes(content: bytes) -> Optional[SmaliClass]:
+    """解析已读入内存的 smali 文件内容 (原始字节)"""
+    # 与文本模式的通用换行一致: \r\n / \r 视为 \n
+    if b'\r' in content:
+        content = content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    
+    return _parse_smali_content(content)
+
+
+def _parse_smali_content(content) -> Optional[SmaliClass]:
+    """从 smali 文件的原始字节 (bytes 或 mmap，换行已统一为 \\n) 中解析类信息"""
     class_name = ''
     super_class = 'java.lang.Object'
     interfaces = []
@@ -254,11 +224,12 @@ def parse_smali_file(smali_path: str) -> Optional[SmaliClass]:
     is_interface = False
     is_abstract = False
     
-    for line in content.split('\n'):
-        line = line.strip()
+    for directive in DIRECTIVE_LINE_PATTERN.finditer(content):
+        kind = directive.group(2).decode('ascii')
+        line = directive.group(1).decode('utf-8', 'replace').rstrip()
         
         # 类声明
-        if line.startswith('.class'):
+        if kind == 'class':
             match = CLASS_PATTERN.search(line)
             if match:
                 modifiers = match.group(1) or ''
@@ -275,8 +246,8 @@ def parse_smali_file(smali_path: str) -> Optional[SmaliClass]:
                 is_abstract = 'abstract' in modifiers
         
         # 父类
-        elif line.startswith('.super'):
-            match = re.search(r'\.super\s+(\S+)', line)
+        elif kind == 'super':
+            match = SUPER_PATTERN.search(line)
             if match:
                 raw_super = match.group(1)
                 if raw_super.startswith('L') and raw_super.endswith(';'):
@@ -285,8 +256,8 @@ def parse_smali_file(smali_path: str) -> Optional[SmaliClass]:
                     super_class = raw_super.replace('/', '.')
         
         # 接口
-        elif line.startswith('.implements'):
-            match = re.search(r'\.implements\s+(\S+)', line)
+        elif kind == 'implements':
+            match = IMPLEMENTS_PATTERN.search(line)
             if match:
                 raw_iface = match.group(1)
                 if raw_iface.startswith('L') and raw_iface.endswith(';'):
@@ -295,40 +266,37 @@ def parse_smali_file(smali_path: str) -> Optional[SmaliClass]:
                     interfaces.append(raw_iface.replace('/', '.'))
         
         # 方法
-        elif line.startswith('.method'):
-            match = METHOD_PATTERN.search(line)
-            if not match:
+        elif kind == 'method':
+            parsed = _parse_method_line(line)
+            if parsed is None:
                 match = METHOD_PATTERN_FALLBACK.search(line)
+                if match:
+                    parsed = (set(), match.group(1), match.group(2), match.group(3))
             
-            if match:
-                if len(match.groups()) == 4:
-                    modifiers = match.group(1) or ''
-                    name = match.group(2)
-                    params_desc = match.group(3)
-                    return_desc = match.group(4)
-                else:
-                    modifiers = ''
-                    name = match.group(1)
-                    params_desc = match.group(2)
-                    return_desc = match.group(3)
+            if parsed:
+                modifiers, name, params_desc, return_desc = parsed
                 
                 descriptor = f'({params_desc}){return_desc}'
                 params, return_type, _ = parse_method_descriptor(descriptor)
                 
+                flags = 0
+                for modifier in modifiers:
+                    flags |= _MOD_FLAGS.get(modifier, 0)
+                
                 methods.append(SmaliMethod(
                     name=name,
                     descriptor=descriptor,
                     return_type=return_type,
                     param_types=params,
-                    is_static='static' in modifiers.lower() if modifiers else False,
-                    is_abstract='abstract' in modifiers.lower() if modifiers else False,
+                    is_static=bool(flags & MOD_STATIC),
+                    is_abstract=bool(flags & MOD_ABSTRACT),
                     is_constructor=name in ('<init>', '<clinit>'),
-                    is_bridge='bridge' in modifiers.lower() if modifiers else False,
-                    is_synthetic='synthetic' in modifiers.lower() if modifiers else False
+                    is_bridge=bool(flags & MOD_BRIDGE),
+                    is_synthetic=bool(flags & MOD_SYNTHETIC)
                 ))
         
         # 字段
-        elif line.startswith('.field'):
+        elif kind == 'field':
             match = FIELD_PATTERN.search(line)
             if match:
                 field_name = match.group(2)
@@ -353,16 +321,43 @@ def parse_smali_file(smali_path: str) -> Optional[SmaliClass]:
     )
 
 
+# load_smali_class 的进程级 LRU 缓存: (类名, smali 目录) -> SmaliClass
+SMALI_CLASS_CACHE_SIZE = 8192
+_smali_class_cache: OrderedDict = OrderedDict()
+
+
 def load_smali_class(obf_class_name: str, smali_dir: str = None) -> Optional[SmaliClass]:
-    """从 smali_output 加载类信息"""
+    """
+    从 smali_output 加载类信息
+    
+    解析结果按 (类名, smali 目录) 在进程内缓存（有界 LRU），多个 SmaliEnhancedMapper 实例共享；
+    文件缺失或解析失败的结果不缓存，之后出现的文件仍可加载。
+    smali 文件在运行期间被修改时需调用 clear_smali_class_cache()
+    """
     if smali_dir is None:
         smali_dir = CONFIG['SMALI_DIR']
     
+    key = (obf_class_name, smali_dir)
+    smali_class = _smali_class_cache.get(key)
+    if smali_class is not None:
+        _smali_class_cache.move_to_end(key)
+        return smali_class
+    
     smali_path = os.path.join(
         smali_dir,
         obf_class_name.replace('.', '/') + '.smali'
     )
-    return parse_smali_file(smali_path)
+    smali_class = parse_smali_file(smali_path)
+    if smali_class is not None:
+        _smali_class_cache[key] = smali_class
+        if len(_smali_class_cache) > SMALI_CLASS_CACHE_SIZE:
+            _smali_class_cache.popitem(last=False)
+    return smali_class
+
+
+def clear_smali_class_cache() -> None:
+    """清空 load_smali_class 的进程级缓存"""
+    _smali_class_cache.clear()
 
 
 # ==================== 启发式命名规则 ====================
@@ -427,10 +422,28 @@ class SmaliEnhancedMapper:
         self._smali_cache: Dict[str, Optional[SmaliClass]] = {}
         
         # 方法签名索引
-        self._method_by_signature: Dict[Tuple[str, int], List[Tuple[str, str, str]]] = defaultdict(list)
+        self._method_by_signature: Dict[Tuple[str, int], Tuple[Tuple[str, str, str], ...]] = {}
+        
+        # 成员查找索引（取代对 member_map[类] 的线性扫描，保持原列表顺序下“首个命中”的语义）
+        # (类, 混淆方法名) -> 同名方法映射列表
+        self._methods_by_name: Dict[Tuple[str, str], List[MemberMapping]] = defaultdict(list)
+        # (类, 描述符) -> 首个描述符相同的方法原名
+        self._method_by_descriptor: Dict[Tuple[str, str], str] = {}
+        # (类, 混淆方法名, 描述符) -> 首个同名且描述符相同的方法原名
+        self._method_by_name_descriptor: Dict[Tuple[str, str, str], str] = {}
+        # (类, 混淆字段名) -> 首个同名字段原名
+        self._field_by_name: Dict[Tuple[str, str], str] = {}
         
         # 继承链缓存 (避免重复计算)
         self._inheritance_chain_cache: Dict[str, List[str]] = {}
+        # 继承链中在 member_map 里有映射的祖先 (按继承链顺序)
+        self._mapped_ancestors_cache: Dict[str, List[str]] = {}
+        # 祖先类 -> {smali 方法描述符: 原名}，对应继承查找第三遍的结果
+        self._ancestor_methods_by_desc: Dict[str, Dict[str, str]] = {}
+        
+        # 推断结果缓存: (类, 方法名, 描述符) / (类, 字段名) -> 推断名称
+        self._infer_cache: Dict[Tuple[str, str, str], Optional[str]] = {}
+        self._infer_field_cache: Dict[Tuple[str, str], Optional[str]] = {}
         
         # Android SDK 接口映射器
         self._android_mapper = create_android_mapper() if ANDROID_MAPPER_AVAILABLE else None
@@ -439,26 +452,70 @@ class SmaliEnhancedMapper:
         self._build_indices()
     
     def _build_indices(self):
-        """构建方法签名索引"""
+        """
+        构建方法签名索引与成员查找索引
+        
+        方法条目在此一次性转换为 MemberMapping，热路径上只做属性访问；
+        调用方传入的 member_map 本身保持不变 (其他模块仍按 dict 使用)
+        """
+        by_signature: Dict[Tuple[str, int], List[Tuple[str, str, str]]] = defaultdict(list)
         for obf_class, members in self.member_map.items():
+            obf_class = sys.intern(obf_class)
             for m in members:
-                if m.get('is_method'):
-                    sig = m.get('signature', '')
-                    if sig:
-                        param_count = sig.count(',') + 1 if sig.strip('()') else 0
-                    else:
-                        param_count = 0
-                    
-                    ret_type = m.get('return_type', 'void')
-                    key = (ret_type, param_count)
-                    self._method_by_signature[key].append((obf_class, m['obf'], m['orig']))
+                if not m.get('is_method'):
+                    self._field_by_name.setdefault((obf_class, m['obf']), m['orig'])
+                    continue
+                
+                mapping = _normalize_method_mapping(m)
+                self._methods_by_name[(obf_class, mapping.obf)].append(mapping)
+                descriptor = mapping.descriptor
+                if descriptor:
+                    self._method_by_descriptor.setdefault((obf_class, descriptor), mapping.orig)
+                    self._method_by_name_descriptor.setdefault((obf_class, mapping.obf, descriptor), mapping.orig)
+                
+                sig = mapping.signature
+                if sig:
+                    param_count = sig.count(',') + 1 if sig.strip('()') else 0
+                else:
+                    param_count = 0
+                
+                key = (mapping.return_type, param_count)
+                by_signature[key].append((obf_class, mapping.obf, mapping.orig))
+        
+        # 构建完成后冻结为元组，去掉列表的预留容量
+        self._method_by_signature = {
+            key: tuple(entries) for key, entries in by_signature.items()
+        }
+    
+    def lookup_by_signature(self, ret_type: str, param_count: int) -> Tuple[Tuple[str, str, str], ...]:
+        """
+        按 (返回类型, 参数数量) 查询候选方法
+        
+        Returns:
+            ((混淆类名, 混淆方法名, 原始方法名), ...)，无候选时为空元组
+        """
+        return self._method_by_signature.get((ret_type, param_count), ())
     
     def get_smali_class(self, obf_class_name: str) -> Optional[SmaliClass]:
-        """获取 smali 类信息（带缓存）"""
+        """
+        获取 smali 类信息（带缓存）
+        
+        实例缓存只保存引用（含预填充的类），未命中时经 load_smali_class 的进程级缓存加载，
+        同一 smali 目录下的多个映射器不会重复解析同一文件
+        """
         if obf_class_name not in self._smali_cache:
             self._smali_cache[obf_class_name] = load_smali_class(obf_class_name, self.smali_dir)
         return self._smali_cache[obf_class_name]
     
+    def preload_smali_classes(self, classes: Dict[str, SmaliClass]) -> None:
+        """
+        批量预填充 smali 类缓存
+        
+        Args:
+            classes: {obf_class_name: SmaliClass}，如 scan_all_smali_classes_parallel 的结果
+        """
+        self._smali_cache.update(classes)
+    
     def get_inheritance_chain(self, obf_class: str) -> List[str]:
         """
         获取完整继承链 (包括所有父类和接口)
@@ -470,10 +527,10 @@ class SmaliEnhancedMapper:
         
         chain = []
         visited = set()
-        queue = [obf_class]
+        queue = deque([obf_class])
         
         while queue:
-            current = queue.pop(0)
+            current = queue.popleft()
             
             if current in visited or current == 'java.lang.Object' or current.startswith('java.'):
                 continue
@@ -497,6 +554,38 @@ class SmaliEnhancedMapper:
         self._inheritance_chain_cache[obf_class] = chain
         return chain
     
+    def _get_mapped_ancestors(self, obf_class: str) -> List[str]:
+        """继承链中在 member_map 里有映射的祖先 (带缓存)"""
+        ancestors = self._mapped_ancestors_cache.get(obf_class)
+        if ancestors is None:
+            ancestors = [a for a in self.get_inheritance_chain(obf_class) if a in self.member_map]
+            self._mapped_ancestors_cache[obf_class] = ancestors
+        return ancestors
+    
+    def _get_ancestor_methods_by_desc(self, ancestor: str) -> Dict[str, str]:
+        """
+        祖先类 smali 方法描述符 -> 映射原名 (带缓存)
+        
+        对每个描述符，按 smali 方法顺序取第一个能在映射表中找到同名映射、
+        且映射无描述符或描述符一致的方法
+        """
+        by_desc = self._ancestor_methods_by_desc.get(ancestor)
+        if by_desc is None:
+            by_desc = {}
+            ancestor_smali = self.get_smali_class(ancestor)
+            if ancestor_smali:
+                for ancestor_method in ancestor_smali.methods:
+                    descriptor = ancestor_method.descriptor
+                    if descriptor in by_desc:
+                        continue
+                    for m in self._methods_by_name.get((ancestor, ancestor_method.name), ()):
+                        # 再次验证签名（如果有）
+                        if not m.descriptor or m.descriptor == descriptor:
+                            by_desc[descriptor] = m.orig
+                            break
+            self._ancestor_methods_by_desc[ancestor] = by_desc
+        return by_desc
+    
     def infer_method_name(self, obf_class: str, method: SmaliMethod) -> Optional[str]:
         """
         推断方法的语义名称
@@ -507,36 +596,44 @@ class SmaliEnhancedMapper:
         3. 启发式规则 (可配置)
         
         修复: 处理方法重载歧义 - 当存在多个同名方法时，仅使用签名匹配
+        
+        结果按 (类, 方法名, 描述符) 缓存
         """
+        key = (obf_class, method.name, method.descriptor)
+        if key in self._infer_cache:
+            return self._infer_cache[key]
+        
+        result = self._infer_method_name_uncached(obf_class, method)
+        self._infer_cache[key] = result
+        return result
+    
+    def _infer_method_name_uncached(self, obf_class: str, method: SmaliMethod) -> Optional[str]:
+        """infer_method_name 的实际推断逻辑（不经缓存）"""
         # 0. 特殊方法
         if method.name in SPECIAL_METHOD_PATTERNS:
             return SPECIAL_METHOD_PATTERNS[method.name]
         
         # 1. 检查当前类的现有映射
-        if obf_class in self.member_map:
-            # 收集所有同名方法
-            same_name_methods = [
-                m for m in self.member_map[obf_class]
-                if m.get('is_method') and m['obf'] == method.name
-            ]
-            
+        # 收集所有同名方法（索引查找）
+        same_name_methods = self._methods_by_name.get((obf_class, method.name))
+        if same_name_methods:
             if len(same_name_methods) == 1:
                 # 只有一个同名方法，可以安全匹配
                 m = same_name_methods[0]
                 # 但仍需验证参数数量（如果有信息）
-                if m.get('descriptor'):
-                    if m['descriptor'] == method.descriptor:
-                        return m['orig']
+                if m.descriptor:
+                    if m.descriptor == method.descriptor:
+                        return m.orig
                     # 签名不匹配，跳过
                 else:
                     # 无签名信息，使用弱匹配但检查参数数量
                     if self._check_param_count_compatible(m, method):
-                        return m['orig']
-            elif len(same_name_methods) > 1:
+                        return m.orig
+            else:
                 # 存在重载，必须严格匹配签名
-                for m in same_name_methods:
-                    if m.get('descriptor') and m['descriptor'] == method.descriptor:
-                        return m['orig']
+                orig = self._method_by_name_descriptor.get((obf_class, method.name, method.descriptor))
+                if orig is not None:
+                    return orig
                 # 无法精确匹配，跳过以避免歧义
         
         # 2. 递归查找继承链
@@ -545,7 +642,7 @@ class SmaliEnhancedMapper:
             return inherited_name
         
         # 2.5 Android SDK 接口映射
-        interface_name = self._infer_from_android_interface(obf_class, method)
+        interface_name = self._infer_from_android_interface(self.get_smali_class(obf_class), method)
         if interface_name:
             return interface_name
         
@@ -557,7 +654,7 @@ class SmaliEnhancedMapper:
         
         return None
     
-    def _infer_from_android_interface(self, obf_class: str, method: SmaliMethod) -> Optional[str]:
+    def _infer_from_android_interface(self, smali_class: Optional[SmaliClass], method: SmaliMethod) -> Optional[str]:
         """
         从 Android SDK 接口映射推断方法名
         
@@ -566,7 +663,6 @@ class SmaliEnhancedMapper:
         if not self._android_mapper:
             return None
         
-        smali_class = self.get_smali_class(obf_class)
         if not smali_class or not smali_class.interfaces:
             return None
         
@@ -581,14 +677,14 @@ class SmaliEnhancedMapper:
         
         return None
     
-    def _check_param_count_compatible(self, mapping: dict, method: SmaliMethod) -> bool:
+    def _check_param_count_compatible(self, mapping: MemberMapping, method: SmaliMethod) -> bool:
         """
         检查映射条目与方法的参数数量是否兼容
         
         用于在无签名信息时进行最低限度的验证
         """
         # 从 signature 字段提取参数数量
-        sig = mapping.get('signature', '')
+        sig = mapping.signature
         if not sig:
             # 无签名信息，假设兼容（保守策略）
             return True
@@ -617,51 +713,30 @@ class SmaliEnhancedMapper:
         
         修复: 处理重载歧义，避免错误匹配
         """
-        inheritance_chain = self.get_inheritance_chain(obf_class)
+        # 只有 member_map 中存在的祖先才可能提供映射
+        mapped_ancestors = self._get_mapped_ancestors(obf_class)
         
-        for ancestor in inheritance_chain:
-            if ancestor not in self.member_map:
-                continue
-            
+        for ancestor in mapped_ancestors:
             # 第一遍：严格签名匹配
-            for m in self.member_map[ancestor]:
-                if not m.get('is_method'):
-                    continue
-                
-                if m.get('descriptor') and m['descriptor'] == method.descriptor:
-                    return m['orig']
+            orig = self._method_by_descriptor.get((ancestor, method.descriptor))
+            if orig is not None:
+                return orig
             
             # 第二遍：名称匹配（仅当该祖先类中无重载时）
-            same_name_methods = [
-                m for m in self.member_map[ancestor]
-                if m.get('is_method') and m['obf'] == method.name
-            ]
+            same_name_methods = self._methods_by_name.get((ancestor, method.name))
             
-            if len(same_name_methods) == 1:
+            if same_name_methods and len(same_name_methods) == 1:
                 m = same_name_methods[0]
                 # 验证参数数量兼容性
                 if self._check_param_count_compatible(m, method):
-                    return m['orig']
+                    return m.orig
             # 如果存在多个同名方法（重载），跳过以避免歧义
         
         # 第三遍：通过 Smali 文件查找同签名方法
-        for ancestor in inheritance_chain:
-            ancestor_smali = self.get_smali_class(ancestor)
-            if not ancestor_smali:
-                continue
-            
-            for ancestor_method in ancestor_smali.methods:
-                if ancestor_method.descriptor == method.descriptor:
-                    # 在映射表中查找该祖先方法的映射
-                    if ancestor in self.member_map:
-                        for m in self.member_map[ancestor]:
-                            if m.get('is_method') and m['obf'] == ancestor_method.name:
-                                # 再次验证签名（如果有）
-                                if m.get('descriptor'):
-                                    if m['descriptor'] == method.descriptor:
-                                        return m['orig']
-                                else:
-                                    return m['orig']
+        for ancestor in mapped_ancestors:
+            orig = self._get_ancestor_methods_by_desc(ancestor).get(method.descriptor)
+            if orig is not None:
+                return orig
         
         return None
     
@@ -691,20 +766,28 @@ class SmaliEnhancedMapper:
         return None
     
     def infer_field_name(self, obf_class: str, field_name: str, field_type: str) -> Optional[str]:
-        """推断字段的语义名称"""
+        """推断字段的语义名称（结果按 (类, 字段名) 缓存）"""
+        key = (obf_class, field_name)
+        if key in self._infer_field_cache:
+            return self._infer_field_cache[key]
+        
+        result = self._infer_field_name_uncached(obf_class, field_name)
+        self._infer_field_cache[key] = result
+        return result
+    
+    def _infer_field_name_uncached(self, obf_class: str, field_name: str) -> Optional[str]:
+        """infer_field_name 的实际推断逻辑（不经缓存）"""
         # 检查现有映射
-        if obf_class in self.member_map:
-            for m in self.member_map[obf_class]:
-                if not m.get('is_method') and m['obf'] == field_name:
-                    return m['orig']
+        orig = self._field_by_name.get((obf_class, field_name))
+        if orig is not None:
+            return orig
         
         # 递归检查父类
         inheritance_chain = self.get_inheritance_chain(obf_class)
         for ancestor in inheritance_chain:
-            if ancestor in self.member_map:
-                for m in self.member_map[ancestor]:
-                    if not m.get('is_method') and m['obf'] == field_name:
-                        return m['orig']
+            orig = self._field_by_name.get((ancestor, field_name))
+            if orig is not None:
+                return orig
         
         return None
     
@@ -722,6 +805,16 @@ class SmaliEnhancedMapper:
 
 # ==================== 代码增强器 ====================
 
+# Java 方法声明前缀 (修饰符 + 返回类型)，后接方法名和参数列表
+_METHOD_SIG_PREFIX = r'(?:public|private|protected)\s+(?:static\s+)?(?:abstract\s+)?(?:final\s+)?\S+\s+'
+
+
+@lru_cache(maxsize=4096)
+def _method_sig_pattern(name: str) -> re.Pattern:
+    """按方法名缓存的方法声明正则"""
+    return re.compile('(' + _METHOD_SIG_PREFIX + re.escape(name) + r'\s*\([^)]*\))', re.MULTILINE)
+
+
 class SmaliCodeEnhancer:
     """使用 Smali 信息增强反编译代码"""
     
@@ -742,11 +835,7 @@ class SmaliCodeEnhancer:
             if method.is_constructor:
                 continue
             
-            pattern = re.compile(
-                r'((?:public|private|protected)\s+(?:static\s+)?(?:abstract\s+)?(?:final\s+)?'
-                r'\S+\s+' + re.escape(method.name) + r'\s*\([^)]*\))',
-                re.MULTILINE
-            )
+            pattern = _method_sig_pattern(method.name)
             
             inferred = self.mapper.infer_method_name(obf_class, method)
             params_str = ', '.join(method.param_types) if method.param_types else ''
@@ -758,7 +847,9 @@ class SmaliCodeEnhancer:
             
             def add_comment(m):
                 original = m.group(0)
-                if '@SmaliSig' in code[:m.start()].split('\n')[-1]:
+                start = m.start()
+                # 仅取匹配位置所在行的前缀，避免对整段前文切片再 split
+                if '@SmaliSig' in code[code.rfind('\n', 0, start) + 1:start]:
                     return original
                 return f"{sig_comment} {original}"
             
@@ -769,19 +860,117 @@ class SmaliCodeEnhancer:
 
 # ==================== 并行批量处理 ====================
 
+def _iter_smali_files(smali_dir: str):
+    """
+    基于 os.scandir 递归产出目录下所有 smali 文件路径
+    
+    直接按 DirEntry.name 过滤，不为每个目录构建 dirs/files 列表；
+    遍历顺序、符号链接（不进入链接目录）与不可读目录的处理与 os.walk 一致
+    """
+    stack = [smali_dir]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            continue
+        subdirs = []
+        with entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    try:
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    except OSError:
+                        pass
+                elif entry.name.endswith('.smali'):
+                    yield entry.path
+        # 逆序入栈，保证与 os.walk 相同的先序遍历顺序
+        stack.extend(reversed(subdirs))
+
+
+def _read_small_smali_file(smali_path: str) -> Optional[bytes]:
+    """
+    读取小于 mmap 阈值的 smali 文件内容
+    
+    大文件或读取失败时返回 None，由调用方回退到 parse_smali_file
+    """
+    try:
+        with open(smali_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= SMALI_MMAP_THRESHOLD:
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def _iter_smali_file_contents(smali_paths: List[str], io_workers: int, batch_size: int = 256):
+    """
+    按批并发读取 smali 文件，产出 (路径, 内容或 None)
+    
+    读取在线程中进行 (文件 I/O 释放 GIL)，一批在解析时下一批已在读取，
+    内存中最多保留两批内容；产出顺序与 smali_paths 一致
+    """
+    batches = [smali_paths[i:i + batch_size] for i in range(0, len(smali_paths), batch_size)]
+    if not batches:
+        return
+    
+    with ThreadPoolExecutor(max_workers=io_workers) as executor:
+        ahead = executor.map(_read_small_smali_file, batches[0])
+        for index, batch in enumerate(batches):
+            current = ahead
+            if index + 1 < len(batches):
+                ahead = executor.map(_read_small_smali_file, batches[index + 1])
+            yield from zip(batch, current)
+
+
+def _collect_smali_files(smali_dir: str) -> List[str]:
+    """收集目录下所有 smali 文件路径"""
+    return list(_iter_smali_files(smali_dir))
+
+
 def scan_all_smali_classes_parallel(smali_dir: str = None, max_workers: int = None) -> Dict[str, SmaliClass]:
-    """并行扫描所有 smali 类"""
+    """
+    并行扫描所有 smali 类 (多进程)
+    
+    parse_smali_file 为纯 Python 的 CPU 密集工作，线程受 GIL 限制几乎无加速，
+    改用进程池并按块分发任务以减少进程间通信次数
+    """
+    if smali_dir is None:
+        smali_dir = CONFIG['SMALI_DIR']
+    if max_workers is None:
+        max_workers = CONFIG['MAX_WORKERS']
+    
+    smali_files = _collect_smali_files(smali_dir)
+    
+    classes = {}
+    if max_workers <= 1 or len(smali_files) <= 1:
+        for smali_class in map(parse_smali_file, smali_files):
+            if smali_class and smali_class.class_name:
+                classes[smali_class.class_name] = smali_class
+        return classes
+    
+    chunksize = max(1, len(smali_files) // (max_workers * 8))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for smali_class in executor.map(parse_smali_file, smali_files, chunksize=chunksize):
+            if smali_class and smali_class.class_name:
+                classes[smali_class.class_name] = smali_class
+    
+    return classes
+
+
+def scan_all_smali_classes_threaded(smali_dir: str = None, max_workers: int = None) -> Dict[str, SmaliClass]:
+    """并行扫描所有 smali 类 (多线程，适用于网络文件系统等以 I/O 等待为主的场景)"""
     if smali_dir is None:
         smali_dir = CONFIG['SMALI_DIR']
     if max_workers is None:
         max_workers = CONFIG['MAX_WORKERS']
     
-    # 收集所有 smali 文件路径
-    smali_files = []
-    for root, dirs, files in os.walk(smali_dir):
-        for file in files:
-            if file.endswith('.smali'):
-                smali_files.append(os.path.join(root, file))
+    smali_files = _collect_smali_files(smali_dir)
     
     classes = {}
     
@@ -799,20 +988,35 @@ def scan_all_smali_classes_parallel(smali_dir: str = None, max_workers: int = No
     return classes
 
 
-def scan_all_smali_classes(smali_dir: str = None) -> Dict[str, SmaliClass]:
-    """扫描所有 smali 类 (串行版本，用于小规模)"""
+def scan_all_smali_classes(smali_dir: str = None, io_workers: int = None) -> Dict[str, SmaliClass]:
+    """
+    扫描所有 smali 类 (串行解析版本，用于小规模)
+    
+    解析在当前线程串行进行，文件读取按批交给 io_workers 个线程预取，
+    使冷缓存下的 open/read 等待与解析重叠；io_workers <= 1 时逐个读取
+    """
     if smali_dir is None:
         smali_dir = CONFIG['SMALI_DIR']
+    if io_workers is None:
+        io_workers = CONFIG['MAX_WORKERS']
     
     classes = {}
     
-    for root, dirs, files in os.walk(smali_dir):
-        for file in files:
-            if file.endswith('.smali'):
-                smali_path = os.path.join(root, file)
-                smali_class = parse_smali_file(smali_path)
-                if smali_class and smali_class.class_name:
-                    classes[smali_class.class_name] = smali_class
+    if io_workers <= 1:
+        for smali_path in _iter_smali_files(smali_dir):
+            smali_class = parse_smali_file(smali_path)
+            if smali_class and smali_class.class_name:
+                classes[smali_class.class_name] = smali_class
+        return classes
+    
+    smali_files = _collect_smali_files(smali_dir)
+    for smali_path, content in _iter_smali_file_contents(smali_files, io_workers):
+        if content is not None:
+            smali_class = parse_smali_bytes(content)
+        else:
+            smali_class = parse_smali_file(smali_path)
+        if smali_class and smali_class.class_name:
+            classes[smali_class.class_name] = smali_class
     
     return classes
 
@@ -824,7 +1028,9 @@ def generate_unmapped_method_report(
     smali_dir: str = None
 ):
     """生成未映射方法报告"""
-    mapper = SmaliEnhancedMapper(class_map, member_map, smali_dir=smali_dir, enable_heuristics=False)
+    # 单个带启发式的 mapper 贯穿整个报告，共享 smali 缓存、继承链缓存和推断缓存
+    mapper = SmaliEnhancedMapper(class_map, member_map, smali_dir=smali_dir, enable_heuristics=True)
+    heuristic_prefix = mapper.heuristic_prefix
     
     unmapped_methods = []
     total_methods = 0
@@ -842,14 +1048,10 @@ def generate_unmapped_method_report(
             
             total_methods += 1
             
-            # 使用带启发式的 mapper 检查
-            mapper_with_heuristics = SmaliEnhancedMapper(
-                class_map, member_map, smali_dir=smali_dir, enable_heuristics=True
-            )
-            inferred = mapper_with_heuristics.infer_method_name(obf_class, method)
+            inferred = mapper.infer_method_name(obf_class, method)
             
             if inferred:
-                if inferred.startswith(CONFIG['HEURISTIC_PREFIX']):
+                if inferred.startswith(heuristic_prefix):
                     heuristic_methods += 1
                 else:
                     mapped_methods += 1
@@ -867,27 +1069,34 @@ def generate_unmapped_method_report(
     for m in unmapped_methods:
         by_class[m['class']].append(m)
     
-    # 生成报告
+    # 统计行 (报告头与控制台输出共用)
+    denominator = max(total_methods, 1)
+    stats = [
+        f"总方法数: {total_methods}",
+        f"精确映射: {mapped_methods} ({mapped_methods/denominator*100:.1f}%)",
+        f"启发推断: {heuristic_methods} ({heuristic_methods/denominator*100:.1f}%)",
+        f"未映射: {len(unmapped_methods)} ({len(unmapped_methods)/denominator*100:.1f}%)",
+    ]
+    
+    # 生成报告: 先在内存中拼好全部行，一次写出
+    lines = ["# 未映射方法报告"]
+    lines.extend(f"# {stat}" for stat in stats)
+    lines.append("")
+    
+    for cls, methods in sorted(by_class.items()):
+        lines.append(f"=== {cls} ===")
+        for m in methods:
+            params = ', '.join(m['param_types'])
+            lines.append(f"  {m['return_type']} {m['method']}({params})")
+        lines.append("")
+    
     with open(output_path, 'w', encoding='utf-8') as f:
-        f.write("# 未映射方法报告\n")
-        f.write(f"# 总方法数: {total_methods}\n")
-        f.write(f"# 精确映射: {mapped_methods} ({mapped_methods/max(total_methods,1)*100:.1f}%)\n")
-        f.write(f"# 启发推断: {heuristic_methods} ({heuristic_methods/max(total_methods,1)*100:.1f}%)\n")
-        f.write(f"# 未映射: {len(unmapped_methods)} ({len(unmapped_methods)/max(total_methods,1)*100:.1f}%)\n\n")
-        
-        for cls in sorted(by_class.keys()):
-            methods = by_class[cls]
-            f.write(f"=== {cls} ===\n")
-            for m in methods:
-                params = ', '.join(m['param_types'])
-                f.write(f"  {m['return_type']} {m['method']}({params})\n")
-            f.write("\n")
+        f.write('\n'.join(lines))
+        f.write('\n')
     
     print(f"报告已生成: {output_path}")
-    print(f"  总方法数: {total_methods}")
-    print(f"  精确映射: {mapped_methods} ({mapped_methods/max(total_methods,1)*100:.1f}%)")
-    print(f"  启发推断: {heuristic_methods} ({heuristic_methods/max(total_methods,1)*100:.1f}%)")
-    print(f"  未映射: {len(unmapped_methods)} ({len(unmapped_methods)/max(total_methods,1)*100:.1f}%)")
+    for stat in stats:
+        print(f"  {stat}")
 
 
 # ==================== 集成接口 ====================
@@ -0,0 +1,34 @@
+import os
+import sys
+import unittest
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ast_deobfuscator import ASTDeobfuscator, ASTParseError, is_ast_available
+
+
+CLASS_MAP = {'com.ex.C': 'com.ex.Real', 'com.ex.Z': 'com.ex.Z'}
+
+
+@unittest.skipUnless(is_ast_available(), 'tree-sitter 不可用')
+class ParseTimeoutTest(unittest.TestCase):
+
+    def test_parse_after_timeout_uses_fresh_document(self):
+        deob = ASTDeobfuscator(CLASS_MAP, {})
+        parser = deob._get_parser()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            parser.timeout_micros = 1
+        big = 'class B { ' + 'int f() { return 1 + 2 * 3; } ' * 20000 + '}'
+        with self.assertRaises(ASTParseError):
+            deob.process(big, 'com.ex.B')
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            parser.timeout_micros = ASTDeobfuscator.PARSE_TIMEOUT_MICROS
+        self.assertEqual(deob.process('class Z { C y; }', 'com.ex.Z'), 'class Z { Real y; }')
+
+
+if __name__ == '__main__':
+    unittest.main()
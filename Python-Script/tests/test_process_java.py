@@ -0,0 +1,28 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_java import deobfuscate_content
+
+
+CLASS_MAP = {'com.ex.Z': 'com.ex.Z'}
+
+
+class FieldRenameTest(unittest.TestCase):
+
+    def test_renamed_field_not_renamed_again(self):
+        # a→b 与 b→total 同时存在时，this.a 只能改写为 b，不能被再次改写为 total
+        member_map = {'com.ex.Z': [
+            {'obf': 'a', 'orig': 'b', 'is_method': False},
+            {'obf': 'b', 'orig': 'total', 'is_method': False},
+        ]}
+        code = 'class Z { void f() { this.a = 1; b[0] = a; } }'
+        self.assertEqual(
+            deobfuscate_content(code, 'com.ex.Z', CLASS_MAP, member_map, ['com.ex.Z']),
+            'class Z { void f() { this.b = 1; total[0] = b; } }')
+
+
+if __name__ == '__main__':
+    unittest.main()
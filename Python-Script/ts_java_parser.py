@@ -9,10 +9,20 @@
 - Query 模式高效匹配
 """
 
+import copy
+import hashlib
+import sys
+import threading
+from collections import OrderedDict, deque, namedtuple
+from functools import cached_property, lru_cache, wraps
 import tree_sitter_java as tsjava
 from tree_sitter import Language, Parser
+try:
+    from tree_sitter import QueryCursor
+except ImportError:  # tree-sitter < 0.25: Query 自带 matches()
+    QueryCursor = None
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # ==================== 语言和查询 ====================
 
@@ -79,10 +89,40 @@ QUERY_FIELD_DECL = """
 
 QUERY_IDENTIFIERS = "(identifier) @id"
 
+QUERY_ERROR = "[(ERROR) @err (MISSING) @err]"
+
+# find_expressions 单次游标遍历收集的表达式节点类型
+_EXPRESSION_TYPES = frozenset((
+    'method_invocation', 'field_access', 'object_creation_expression', 'cast_expression',
+))
+
+# 预编译查询：模块加载时编译一次，所有解析器实例共享（Query 对象只读）
+Queries = namedtuple('Queries', [
+    'method_call', 'field_access', 'local_var', 'class_decl', 'new_expr',
+    'cast', 'method_decl', 'field_decl', 'identifiers', 'error',
+])
+
+_QUERIES = Queries(
+    method_call=JAVA_LANGUAGE.query(QUERY_METHOD_INVOCATION),
+    field_access=JAVA_LANGUAGE.query(QUERY_FIELD_ACCESS),
+    local_var=JAVA_LANGUAGE.query(QUERY_LOCAL_VAR),
+    class_decl=JAVA_LANGUAGE.query(QUERY_CLASS_DECL),
+    new_expr=JAVA_LANGUAGE.query(QUERY_NEW_EXPRESSION),
+    cast=JAVA_LANGUAGE.query(QUERY_CAST),
+    method_decl=JAVA_LANGUAGE.query(QUERY_METHOD_DECL),
+    field_decl=JAVA_LANGUAGE.query(QUERY_FIELD_DECL),
+    identifiers=JAVA_LANGUAGE.query(QUERY_IDENTIFIERS),
+    error=JAVA_LANGUAGE.query(QUERY_ERROR),
+)
+
 
 # ==================== 数据类 ====================
 
-@dataclass
+# Python 3.10+ 使用 __slots__ 数据类：extract_type_info 每次调用都会创建大量实例
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class MethodInfo:
     name: str
     return_type: str
@@ -92,7 +132,7 @@ class MethodInfo:
     end_byte: int
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class FieldInfo:
     name: str
     type_name: str
@@ -100,7 +140,7 @@ class FieldInfo:
     end_byte: int
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class LocalVarInfo:
     name: str
     type_name: str
@@ -108,7 +148,7 @@ class LocalVarInfo:
     scope_end: int
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ClassTypeInfo:
     class_name: str
     parent_class: str = ""
@@ -121,6 +161,24 @@ class ClassTypeInfo:
 
 # ==================== 全局类型索引 ====================
 
+# 继承链查找结果缓存上限 (resolve_field / resolve_method / get_field_type 各一份)
+LOOKUP_CACHE_SIZE = 65536
+
+# 带缓存的查找方法: 公开名 -> 实现方法名
+_CACHED_LOOKUPS = {
+    'resolve_field': '_resolve_field_impl',
+    'resolve_method': '_resolve_method_impl',
+    'get_field_type': '_get_field_type_impl',
+}
+
+
+def _most_common(counts: Dict[str, int]) -> str:
+    """返回计数最大的键（并列时取插入顺序最靠前者），单一候选时直接返回"""
+    if len(counts) == 1:
+        return next(iter(counts))
+    return max(counts, key=counts.__getitem__)
+
+
 class GlobalTypeIndex:
     """
     全局类型索引 - 支持跨类成员解析
@@ -128,16 +186,17 @@ class GlobalTypeIndex:
     
     def __init__(self, class_map: Dict[str, str], member_map: Dict[str, List[dict]]):
         self.class_map = class_map
-        self.reverse_class_map = {v: k for k, v in class_map.items()}
+        # 全局回退表在首次访问时才由 member_map 构建（见 _global_fallbacks）
+        self._member_map = member_map
         
-        # 类型 -> 字段映射 {obf_class: {obf_field: orig_field}}
-        self.field_index: Dict[str, Dict[str, str]] = {}
+        # 字段映射 {(obf_class, obf_field): orig_field}
+        self.field_index: Dict[Tuple[str, str], str] = {}
         
         # 字段类型映射 {(obf_class, obf_field): field_type}  # NEW
         self.field_types: Dict[Tuple[str, str], str] = {}
         
-        # 类型 -> 方法映射 {obf_class: {obf_method: [method_infos]}}
-        self.method_index: Dict[str, Dict[str, List[dict]]] = {}
+        # 方法映射 {(obf_class, obf_method): [method_infos]}
+        self.method_index: Dict[Tuple[str, str], List[dict]] = {}
         
         # 方法返回类型 {(obf_class, obf_method): return_type}
         self.method_returns: Dict[Tuple[str, str], str] = {}
@@ -145,72 +204,105 @@ class GlobalTypeIndex:
         # 继承链 {obf_class: [parent_obf_classes]}
         self.parent_map: Dict[str, List[str]] = {}
         
-        # 全局回退映射 {obf_name: orig_name} (用于接口定义缺失映射的情况)
-        self.global_field_fallback: Dict[str, str] = {}
-        self.global_method_fallback: Dict[str, str] = {}
-        
         self._build_indexes(member_map)
-        self._build_global_fallbacks(member_map)
+        self._bind_lookup_caches()
+    
+    def _bind_lookup_caches(self):
+        """为继承链查找绑定实例级 LRU 缓存（继承关系变化时由 set_inheritance 清空）"""
+        for public, impl in _CACHED_LOOKUPS.items():
+            setattr(self, public, lru_cache(maxsize=LOOKUP_CACHE_SIZE)(getattr(self, impl)))
+    
+    def _clear_lookup_caches(self):
+        for public in _CACHED_LOOKUPS:
+            getattr(self, public).cache_clear()
+    
+    def __getstate__(self):
+        # 缓存包装器不可序列化（索引会被传给工作进程），反序列化后重新绑定；
+        # 每个工作进程都会用到全局回退表，序列化前先构建，避免各进程重复构建
+        self._global_fallbacks
+        state = self.__dict__.copy()
+        for public in _CACHED_LOOKUPS:
+            state.pop(public, None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._bind_lookup_caches()
     
     def _build_indexes(self, member_map: Dict[str, List[dict]]):
-        """构建索引"""
+        """单次遍历 member_map 构建成员索引（含返回类型 / 字段类型信息）"""
+        # 混淆名大量重复：驻留后各索引共享同一字符串对象，键比较可走 is 快速路径
+        intern = sys.intern
         for obf_class, members in member_map.items():
-            self.field_index[obf_class] = {}
-            self.method_index[obf_class] = {}
-            
+            obf_class = intern(obf_class)
             for m in members:
+                obf = intern(m['obf'])
                 if m['is_method']:
-                    if m['obf'] not in self.method_index[obf_class]:
-                        self.method_index[obf_class][m['obf']] = []
-                    self.method_index[obf_class][m['obf']].append(m)
+                    self.method_index.setdefault((obf_class, obf), []).append(m)
                     
                     # 记录返回类型
                     ret_type = m.get('return_type', '')
                     if ret_type and ret_type not in ('void', 'int', 'long', 'float', 'double', 'boolean', 'byte', 'char', 'short'):
-                        self.method_returns[(obf_class, m['obf'])] = ret_type
+                        self.method_returns[(obf_class, obf)] = ret_type
                 else:
-                    self.field_index[obf_class][m['obf']] = m['orig']
-                    # 记录字段类型 (NEW)
-                    field_type = m.get('return_type', '')  # mappings.txt 中字段类型存储在 return_type
+                    self.field_index[(obf_class, obf)] = intern(m['orig'])
+                    # 记录字段类型 (mappings.txt 中字段类型存储在 return_type)
+                    field_type = m.get('return_type', '')
                     if field_type:
-                        self.field_types[(obf_class, m['obf'])] = field_type
-    
-    def _build_global_fallbacks(self, member_map: Dict[str, List[dict]]):
-        """构建全局解析回退表（含返回类型信息）"""
-        from collections import Counter
-        field_counts = {} # obf -> Counter(orig)
-        method_counts = {} # obf -> Counter(orig)
-        # 基于返回类型的方法回退 {(obf, ret_type): Counter(orig)}
-        method_by_sig = {}
+                        self.field_types[(obf_class, obf)] = field_type
+    
+    @cached_property
+    def reverse_class_map(self) -> Dict[str, str]:
+        """{orig_class: obf_class}，首次访问时构建"""
+        return {v: k for k, v in self.class_map.items()}
+    
+    @cached_property
+    def _global_fallbacks(self) -> Tuple[Dict[str, str], Dict[str, str], Dict[Tuple[str, str], str]]:
+        """构建全局解析回退表（含返回类型信息），首次访问任一回退表时执行一次"""
+        field_counts: Dict[str, Dict[str, int]] = {}  # obf -> {orig: count}
+        method_counts: Dict[str, Dict[str, int]] = {}  # obf -> {orig: count}
+        # 基于返回类型的方法回退 {(obf, ret_type): {orig: count}}
+        method_by_sig: Dict[Tuple[str, str], Dict[str, int]] = {}
         
-        for obf_class, members in member_map.items():
+        intern = sys.intern
+        for members in self._member_map.values():
             for m in members:
-                obf = m['obf']
-                orig = m['orig']
+                obf = intern(m['obf'])
+                orig = intern(m['orig'])
                 if m['is_method']:
-                    if obf not in method_counts: method_counts[obf] = Counter()
-                    method_counts[obf][orig] += 1
+                    counts = method_counts.setdefault(obf, {})
+                    counts[orig] = counts.get(orig, 0) + 1
                     
-                    # 按返回类型分组
-                    ret_type = m.get('return_type', 'void')
-                    # 简化返回类型（仅保留基础类型或短名）
-                    simple_ret = ret_type.split('.')[-1] if ret_type else 'void'
-                    key = (obf, simple_ret)
-                    if key not in method_by_sig: method_by_sig[key] = Counter()
-                    method_by_sig[key][orig] += 1
+                    # 按返回类型分组（简化返回类型：仅保留基础类型或短名）
+                    ret_type = m.get('return_type', '')
+                    simple_ret = ret_type.rpartition('.')[2] if ret_type else 'void'
+                    counts = method_by_sig.setdefault((obf, simple_ret), {})
+                    counts[orig] = counts.get(orig, 0) + 1
                 else:
-                    if obf not in field_counts: field_counts[obf] = Counter()
-                    field_counts[obf][orig] += 1
-        
-        for obf, counts in field_counts.items():
-            self.global_field_fallback[obf] = counts.most_common(1)[0][0]
-        for obf, counts in method_counts.items():
-            self.global_method_fallback[obf] = counts.most_common(1)[0][0]
+                    counts = field_counts.setdefault(obf, {})
+                    counts[orig] = counts.get(orig, 0) + 1
         
-        # 存储基于签名的回退 {(obf, ret_type): orig}
-        self.method_by_signature = {}
-        for (obf, ret), counts in method_by_sig.items():
-            self.method_by_signature[(obf, ret)] = counts.most_common(1)[0][0]
+        # 取出现次数最多的原名；并列时取最先出现者（与 Counter.most_common 一致）
+        return (
+            {obf: _most_common(counts) for obf, counts in field_counts.items()},
+            {obf: _most_common(counts) for obf, counts in method_counts.items()},
+            {key: _most_common(counts) for key, counts in method_by_sig.items()},
+        )
+    
+    @cached_property
+    def global_field_fallback(self) -> Dict[str, str]:
+        """全局字段回退映射 {obf_name: orig_name} (用于接口定义缺失映射的情况)"""
+        return self._global_fallbacks[0]
+    
+    @cached_property
+    def global_method_fallback(self) -> Dict[str, str]:
+        """全局方法回退映射 {obf_name: orig_name}"""
+        return self._global_fallbacks[1]
+    
+    @cached_property
+    def method_by_signature(self) -> Dict[Tuple[str, str], str]:
+        """基于签名的方法回退 {(obf, ret_type): orig}"""
+        return self._global_fallbacks[2]
 
     def set_inheritance(self, child: str, parent: str):
         """设置继承关系（支持多接口）"""
@@ -218,50 +310,52 @@ class GlobalTypeIndex:
             self.parent_map[child] = []
         if parent not in self.parent_map[child]:
             self.parent_map[child].append(parent)
+            self._clear_lookup_caches()
     
-    def resolve_field(self, obj_type: str, field_name: str) -> Optional[str]:
+    def _resolve_field_impl(self, obj_type: str, field_name: str) -> Optional[str]:
         """解析字段名（支持多重继承和回退）"""
         if not obj_type: return None  # 禁用全局回退，避免跨类污染
         
-        queue = [obj_type]
-        visited = set()
+        queue = deque((obj_type,))
+        visited = {obj_type}
         
         while queue:
-            current = queue.pop(0)
-            if current in visited: continue
-            visited.add(current)
+            current = queue.popleft()
             
-            if current in self.field_index and field_name in self.field_index[current]:
-                return self.field_index[current][field_name]
+            orig = self.field_index.get((current, field_name))
+            if orig is not None:
+                return orig
             
-            parents = self.parent_map.get(current, [])
-            queue.extend(parents)
+            for parent in self.parent_map.get(current, ()):
+                if parent not in visited:
+                    visited.add(parent)
+                    queue.append(parent)
             
         # 禁用全局回退：仅在明确知道类型时替换
         return None
     
-    def resolve_method(self, obj_type: str, method_name: str, arg_count: int = -1) -> Optional[str]:
+    def _resolve_method_impl(self, obj_type: str, method_name: str, arg_count: int = -1) -> Optional[str]:
         """解析方法名（支持多重继承、重载和回退）"""
         if not obj_type: return None  # 禁用全局回退，避免跨类污染
 
-        queue = [obj_type]
-        visited = set()
+        queue = deque((obj_type,))
+        visited = {obj_type}
         
         while queue:
-            current = queue.pop(0)
-            if current in visited: continue
-            visited.add(current)
+            current = queue.popleft()
             
-            if current in self.method_index and method_name in self.method_index[current]:
-                methods = self.method_index[current][method_name]
+            methods = self.method_index.get((current, method_name))
+            if methods is not None:
                 if arg_count >= 0:
                     for m in methods:
                         if self._count_params(m.get('signature', '')) == arg_count:
                             return m['orig']
                 return methods[0]['orig']
             
-            parents = self.parent_map.get(current, [])
-            queue.extend(parents)
+            for parent in self.parent_map.get(current, ()):
+                if parent not in visited:
+                    visited.add(parent)
+                    queue.append(parent)
             
         # 禁用全局回退：仅在明确知道类型时替换
         return None
@@ -270,19 +364,16 @@ class GlobalTypeIndex:
         """获取方法返回类型"""
         return self.method_returns.get((obj_type, method_name))
     
-    def get_field_type(self, obj_type: str, field_name: str) -> Optional[str]:
+    def _get_field_type_impl(self, obj_type: str, field_name: str) -> Optional[str]:
         """获取字段类型（支持继承链遍历）"""
         if not obj_type:
             return None
         
-        queue = [obj_type]
-        visited = set()
+        queue = deque((obj_type,))
+        visited = {obj_type}
         
         while queue:
-            current = queue.pop(0)
-            if current in visited:
-                continue
-            visited.add(current)
+            current = queue.popleft()
             
             # 查找当前类的字段类型
             field_type = self.field_types.get((current, field_name))
@@ -290,8 +381,10 @@ class GlobalTypeIndex:
                 return field_type
             
             # 继续查找父类
-            parents = self.parent_map.get(current, [])
-            queue.extend(parents)
+            for parent in self.parent_map.get(current, ()):
+                if parent not in visited:
+                    visited.add(parent)
+                    queue.append(parent)
         
         return None
     
@@ -301,7 +394,7 @@ class GlobalTypeIndex:
         inner = signature.strip('()')
         if not inner:
             return 0
-        return len(inner.split(','))
+        return inner.count(',') + 1
 
 
 # ==================== 全局类型索引单例 ====================
@@ -333,6 +426,11 @@ def init_global_type_index(class_map: Dict[str, str], member_map: Dict[str, List
     
     return _global_type_index
 
+def set_global_type_index(index: Optional[GlobalTypeIndex]):
+    """登记已构建的类型索引（工作进程继承或反序列化得到父进程的索引后调用）"""
+    global _global_type_index
+    _global_type_index = index
+
 def reset_global_type_index():
     """重置全局类型索引（用于测试）"""
     global _global_type_index
@@ -341,271 +439,316 @@ def reset_global_type_index():
 
 # ==================== Tree-sitter 解析器 ====================
 
+# 每个解析器实例缓存的解析结果条数上限
+RESULT_CACHE_SIZE = 1024
+
+
+def _copy_result(result):
+    """
+    复制缓存结果
+    
+    find_* 的结果是值均为 str/int 的扁平 dict，逐个浅拷贝即可；其余结果深拷贝
+    """
+    if isinstance(result, dict):
+        return {kind: [dict(d) for d in items] for kind, items in result.items()}
+    if isinstance(result, list):
+        return [dict(d) for d in result]
+    return copy.deepcopy(result)
+
+
+def _memoize_by_content(method):
+    """
+    按代码内容摘要缓存解析结果 (每个解析器实例一份 LRU)
+    
+    键为 (方法名, 内容的 blake2b 摘要)，不持有源码字符串本身；
+    源码只在此编码一次，摘要与解析共用同一份 UTF-8 字节：被装饰方法以 (code, code_bytes) 调用，
+    对外签名仍为 (code)。
+    缓存中保存私有副本，命中时经 _copy_result 返回副本，调用方修改结果不会污染缓存
+    """
+    name = method.__name__
+    
+    @wraps(method)
+    def wrapper(self, code: str):
+        code_bytes = code.encode('utf8')
+        key = (name, hashlib.blake2b(code_bytes, digest_size=16).digest())
+        cache = self._result_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return _copy_result(cache[key])
+        
+        result = method(self, code, code_bytes)
+        cache[key] = _copy_result(result)
+        if len(cache) > RESULT_CACHE_SIZE:
+            cache.popitem(last=False)
+        return result
+    
+    return wrapper
+
+
+def _query_matches(query, node) -> list:
+    """
+    执行 Query 并按匹配分组返回 [(pattern_index, {capture_name: [Node, ...]}), ...]
+    
+    tree-sitter 0.25 起匹配由 QueryCursor 执行，旧版本直接调用 Query.matches()
+    """
+    if QueryCursor is not None:
+        return QueryCursor(query).matches(node)
+    return query.matches(node)
+
+
+def _first(capture_dict: dict, name: str):
+    """取一次匹配中某个捕获的首个节点（可选捕获未命中时返回 None）"""
+    nodes = capture_dict.get(name)
+    return nodes[0] if nodes else None
+
+
 class TreeSitterJavaParser:
     """
     高级 Java 解析器 - 使用 Query 模式
     """
     
+    __slots__ = ('parser', 'language', '_queries', '_result_cache')
+    
     def __init__(self):
         self.parser = Parser(JAVA_LANGUAGE)
         self.language = JAVA_LANGUAGE
         
-        # 编译查询
-        self._query_method_call = self.language.query(QUERY_METHOD_INVOCATION)
-        self._query_field_access = self.language.query(QUERY_FIELD_ACCESS)
-        self._query_local_var = self.language.query(QUERY_LOCAL_VAR)
-        self._query_class_decl = self.language.query(QUERY_CLASS_DECL)
-        self._query_new_expr = self.language.query(QUERY_NEW_EXPRESSION)
-        self._query_cast = self.language.query(QUERY_CAST)
-        self._query_method_decl = self.language.query(QUERY_METHOD_DECL)
-        self._query_field_decl = self.language.query(QUERY_FIELD_DECL)
-        self._query_identifiers = self.language.query(QUERY_IDENTIFIERS)
+        # 复用模块级预编译查询
+        self._queries = _QUERIES
+        
+        # 解析结果缓存 (见 _memoize_by_content)
+        self._result_cache: OrderedDict = OrderedDict()
     
     def parse(self, code: str):
         return self.parser.parse(bytes(code, 'utf8'))
     
-    def extract_type_info(self, code: str) -> ClassTypeInfo:
+    def parse_with_bytes(self, code: str) -> Tuple[object, bytes]:
+        """解析源码并同时返回 UTF-8 字节，供 _node_text 复用，避免重复编码"""
+        code_bytes = code.encode('utf8')
+        return self.parser.parse(code_bytes), code_bytes
+    
+    def parse_file(self, path: str) -> Tuple[object, bytes]:
+        """直接以字节读取并解析源文件，省去 str 解码/再编码的往返"""
+        with open(path, 'rb') as f:
+            code_bytes = f.read()
+        return self.parser.parse(code_bytes), code_bytes
+    
+    @_memoize_by_content
+    def extract_type_info(self, code: str, code_bytes: bytes) -> ClassTypeInfo:
         """提取类型信息"""
-        tree = self.parse(code)
+        tree = self.parser.parse(code_bytes)
         root = tree.root_node
-        code_bytes = bytes(code, 'utf8')
         
         info = ClassTypeInfo(class_name="")
         
         # 收集错误节点
         self._collect_errors(root, info.error_regions)
         
-        # 使用 Query 提取类声明 (API: Dict[str, List[Node]])
-        try:
-            captures = self._query_class_decl.captures(root)
-            if 'class_name' in captures and captures['class_name']:
-                info.class_name = self._node_text(captures['class_name'][0], code_bytes)
-            if 'parent' in captures and captures['parent']:
-                info.parent_class = self._node_text(captures['parent'][0], code_bytes)
-            for node in captures.get('interface', []):
-                info.interfaces.append(self._node_text(node, code_bytes))
-        except:
-            pass
+        # 使用 Query 提取类声明
+        self._fill_class_header(info, root, code_bytes)
         
         # 提取局部变量
-        try:
-            captures = self._query_local_var.captures(root)
-            types = captures.get('type', [])
-            names = captures.get('name', [])
-            for t_node, n_node in zip(types, names):
-                info.local_vars.append(LocalVarInfo(
-                    name=self._node_text(n_node, code_bytes),
-                    type_name=self._node_text(t_node, code_bytes),
-                    scope_start=0,
-                    scope_end=len(code)
-                ))
-        except:
-            pass
+        for _, capture_dict in _query_matches(self._queries.local_var, root):
+            t_node = capture_dict['type'][0]
+            n_node = capture_dict['name'][0]
+            info.local_vars.append(LocalVarInfo(
+                name=self._node_text(n_node, code_bytes),
+                type_name=self._node_text(t_node, code_bytes),
+                scope_start=0,
+                scope_end=len(code)
+            ))
+        
         # 提取字段声明
-        try:
-            captures = self._query_field_decl.captures(root)
-            types = captures.get('type', [])
-            names = captures.get('name', [])
-            for t_node, n_node in zip(types, names):
-                name = self._node_text(n_node, code_bytes)
-                info.fields[name] = FieldInfo(
-                    name=name,
-                    type_name=self._node_text(t_node, code_bytes),
-                    start_byte=n_node.start_byte,
-                    end_byte=n_node.end_byte
-                )
-        except:
-            pass
+        for _, capture_dict in _query_matches(self._queries.field_decl, root):
+            t_node = capture_dict['type'][0]
+            n_node = capture_dict['name'][0]
+            name = self._node_text(n_node, code_bytes)
+            info.fields[name] = FieldInfo(
+                name=name,
+                type_name=self._node_text(t_node, code_bytes),
+                start_byte=n_node.start_byte,
+                end_byte=n_node.end_byte
+            )
             
         # 提取方法声明
-        try:
-            captures = self._query_method_decl.captures(root)
-            ret_types = captures.get('return_type', [])
-            names = captures.get('name', [])
-            params = captures.get('params', [])
-            for r_node, n_node, p_node in zip(ret_types, names, params):
-                name = self._node_text(n_node, code_bytes)
-                m_info = MethodInfo(
-                    name=name,
-                    return_type=self._node_text(r_node, code_bytes),
-                    param_types=[], # 简化：暂不提取参数具体类型
-                    param_count=self._count_args(p_node),
-                    start_byte=n_node.start_byte,
-                    end_byte=n_node.end_byte
-                )
-                if name not in info.methods:
-                    info.methods[name] = []
-                info.methods[name].append(m_info)
-        except:
-            pass
+        for _, capture_dict in _query_matches(self._queries.method_decl, root):
+            r_node = capture_dict['return_type'][0]
+            n_node = capture_dict['name'][0]
+            p_node = capture_dict['params'][0]
+            name = self._node_text(n_node, code_bytes)
+            m_info = MethodInfo(
+                name=name,
+                return_type=self._node_text(r_node, code_bytes),
+                param_types=[], # 简化：暂不提取参数具体类型
+                param_count=self._count_args(p_node),
+                start_byte=n_node.start_byte,
+                end_byte=n_node.end_byte
+            )
+            if name not in info.methods:
+                info.methods[name] = []
+            info.methods[name].append(m_info)
             
         return info
     
+    def extract_class_header(self, code: str) -> ClassTypeInfo:
+        """
+        仅提取类名、父类与实现的接口
+        
+        供继承索引预扫描使用：跳过错误节点收集以及局部变量/字段/方法查询
+        """
+        tree, code_bytes = self.parse_with_bytes(code)
+        info = ClassTypeInfo(class_name="")
+        self._fill_class_header(info, tree.root_node, code_bytes)
+        return info
+    
+    def extract_class_header_file(self, path: str) -> ClassTypeInfo:
+        """extract_class_header 的文件版本：按字节读取解析，不做文本解码"""
+        tree, code_bytes = self.parse_file(path)
+        info = ClassTypeInfo(class_name="")
+        self._fill_class_header(info, tree.root_node, code_bytes)
+        return info
+    
+    def _fill_class_header(self, info: ClassTypeInfo, root, code_bytes: bytes):
+        """使用类声明 Query 填充 class_name / parent_class / interfaces (取文件中第一个类型声明)"""
+        matches = _query_matches(self._queries.class_decl, root)
+        if not matches:
+            return
+        capture_dict = matches[0][1]
+        name_node = _first(capture_dict, 'class_name')
+        if name_node is not None:
+            info.class_name = self._node_text(name_node, code_bytes)
+        parent_node = _first(capture_dict, 'parent')
+        if parent_node is not None:
+            info.parent_class = self._node_text(parent_node, code_bytes)
+        # 每个接口各产生一次匹配，只收集与首个类型声明同名节点的匹配（排除内部类）
+        for _, other in matches:
+            other_name = _first(other, 'class_name')
+            if other_name is None or name_node is None or other_name.start_byte != name_node.start_byte:
+                continue
+            for node in other.get('interface', []):
+                iface = self._node_text(node, code_bytes)
+                if iface not in info.interfaces:
+                    info.interfaces.append(iface)
+    
     def _node_text(self, node, code_bytes: bytes) -> str:
         return code_bytes[node.start_byte:node.end_byte].decode('utf8')
     
-    def find_method_calls_query(self, code: str) -> List[dict]:
-        """使用 Query 查找所有方法调用"""
-        tree = self.parse(code)
-        code_bytes = bytes(code, 'utf8')
-        results = []
+    def _walk_cursor(self, root) -> Iterator:
+        """用 TreeCursor 迭代先序遍历语法树，只产出 _EXPRESSION_TYPES 中的节点"""
+        cursor = root.walk()
+        while True:
+            node = cursor.node
+            if node.type in _EXPRESSION_TYPES:
+                yield node
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return
+    
+    @_memoize_by_content
+    def find_expressions(self, code: str, code_bytes: bytes) -> Dict[str, List[dict]]:
+        """
+        单次遍历同时查找方法调用、字段访问、new 表达式与类型转换
         
-        try:
-            captures = self._query_method_call.captures(tree.root_node)
-            calls = captures.get('call', [])
-            methods = captures.get('method', [])
-            objs = captures.get('obj', [])
-            args_list = captures.get('args', [])
-            
-            # 按位置匹配
-            for i, call_node in enumerate(calls):
+        Returns:
+            {'method_calls': [...], 'field_accesses': [...], 'new_expressions': [...], 'casts': [...]}
+            各列表的条目格式与对应的 find_* 方法一致
+        """
+        tree = self.parser.parse(code_bytes)
+        calls, accesses, news, casts = [], [], [], []
+        
+        for node in self._walk_cursor(tree.root_node):
+            kind = node.type
+            if kind == 'method_invocation':
+                m_node = node.child_by_field_name('name')
+                a_node = node.child_by_field_name('arguments')
+                if m_node is None or a_node is None or m_node.type != 'identifier':
+                    continue
                 result = {
-                    'start_byte': call_node.start_byte,
-                    'end_byte': call_node.end_byte,
-                    'full_text': self._node_text(call_node, code_bytes)
+                    'start_byte': node.start_byte,
+                    'end_byte': node.end_byte,
+                    'full_text': self._node_text(node, code_bytes),
+                    'name': self._node_text(m_node, code_bytes),
+                    'name_start': m_node.start_byte,
+                    'name_end': m_node.end_byte
                 }
-                
-                # 查找属于此调用的子节点
-                for m_node in methods:
-                    if call_node.start_byte <= m_node.start_byte <= call_node.end_byte:
-                        result['name'] = self._node_text(m_node, code_bytes)
-                        result['name_start'] = m_node.start_byte
-                        result['name_end'] = m_node.end_byte
-                        break
-                
-                for o_node in objs:
-                    if call_node.start_byte <= o_node.start_byte <= call_node.end_byte:
-                        result['obj'] = self._node_text(o_node, code_bytes)
-                        result['obj_start'] = o_node.start_byte
-                        break
-                
-                for a_node in args_list:
-                    if call_node.start_byte <= a_node.start_byte <= call_node.end_byte:
-                        result['args'] = self._node_text(a_node, code_bytes)
-                        result['arg_count'] = self._count_args(a_node)
-                        break
-                
-                if 'name' in result:
-                    results.append(result)
-        except:
-            pass
+                o_node = node.child_by_field_name('object')
+                if o_node is not None:
+                    result['obj'] = self._node_text(o_node, code_bytes)
+                    result['obj_start'] = o_node.start_byte
+                result['args'] = self._node_text(a_node, code_bytes)
+                result['arg_count'] = self._count_args(a_node)
+                calls.append(result)
         
-        return results
-    
-    def find_field_accesses_query(self, code: str) -> List[dict]:
-        """使用 Query 查找所有字段访问"""
-        tree = self.parse(code)
-        code_bytes = bytes(code, 'utf8')
-        results = []
+            elif kind == 'field_access':
+                o_node = node.child_by_field_name('object')
+                f_node = node.child_by_field_name('field')
+                if o_node is None or f_node is None or f_node.type != 'identifier':
+                    continue
+                accesses.append({
+                    'start_byte': node.start_byte,
+                    'end_byte': node.end_byte,
+                    'full_text': self._node_text(node, code_bytes),
+                    'obj': self._node_text(o_node, code_bytes),
+                    'field': self._node_text(f_node, code_bytes),
+                    'field_start': f_node.start_byte,
+                    'field_end': f_node.end_byte
+                })
         
-        try:
-            captures = self._query_field_access.captures(tree.root_node)
-            accesses = captures.get('access', [])
-            objs = captures.get('obj', [])
-            fields = captures.get('field', [])
-            
-            for access_node in accesses:
-                result = {
-                    'start_byte': access_node.start_byte,
-                    'end_byte': access_node.end_byte,
-                    'full_text': self._node_text(access_node, code_bytes)
-                }
-                
-                for o_node in objs:
-                    if access_node.start_byte <= o_node.start_byte <= access_node.end_byte:
-                        result['obj'] = self._node_text(o_node, code_bytes)
-                        break
-                
-                for f_node in fields:
-                    if access_node.start_byte <= f_node.start_byte <= access_node.end_byte:
-                        result['field'] = self._node_text(f_node, code_bytes)
-                        result['field_start'] = f_node.start_byte
-                        result['field_end'] = f_node.end_byte
-                        break
-                
-                if 'field' in result:
-                    results.append(result)
-        except:
-            pass
+            elif kind == 'object_creation_expression':
+                t_node = node.child_by_field_name('type')
+                a_node = node.child_by_field_name('arguments')
+                if t_node is None or a_node is None:
+                    continue
+                news.append({
+                    'start_byte': node.start_byte,
+                    'end_byte': node.end_byte,
+                    'type': self._node_text(t_node, code_bytes),
+                    'arg_count': self._count_args(a_node)
+                })
         
-        return results
+            else:  # cast_expression
+                t_node = node.child_by_field_name('type')
+                v_node = node.child_by_field_name('value')
+                if t_node is None or v_node is None:
+                    continue
+                casts.append({
+                    'start_byte': node.start_byte,
+                    'end_byte': node.end_byte,
+                    'type': self._node_text(t_node, code_bytes),
+                    'value': self._node_text(v_node, code_bytes)
+                })
+        
+        return {'method_calls': calls, 'field_accesses': accesses, 'new_expressions': news, 'casts': casts}
+    
+    def find_method_calls_query(self, code: str) -> List[dict]:
+        """查找所有方法调用"""
+        return self.find_expressions(code)['method_calls']
+    
+    def find_field_accesses_query(self, code: str) -> List[dict]:
+        """查找所有字段访问"""
+        return self.find_expressions(code)['field_accesses']
     
     def find_new_expressions(self, code: str) -> List[dict]:
         """查找 new 表达式"""
-        tree = self.parse(code)
-        code_bytes = bytes(code, 'utf8')
-        results = []
-        
-        try:
-            captures = self._query_new_expr.captures(tree.root_node)
-            news = captures.get('new', [])
-            types = captures.get('type', [])
-            args_list = captures.get('args', [])
-            
-            for new_node in news:
-                result = {'start_byte': new_node.start_byte, 'end_byte': new_node.end_byte}
-                
-                for t_node in types:
-                    if new_node.start_byte <= t_node.start_byte <= new_node.end_byte:
-                        result['type'] = self._node_text(t_node, code_bytes)
-                        break
-                
-                for a_node in args_list:
-                    if new_node.start_byte <= a_node.start_byte <= new_node.end_byte:
-                        result['arg_count'] = self._count_args(a_node)
-                        break
-                
-                if 'type' in result:
-                    results.append(result)
-        except:
-            pass
-        
-        return results
+        return self.find_expressions(code)['new_expressions']
     
     def find_casts(self, code: str) -> List[dict]:
         """查找类型转换"""
-        tree = self.parse(code)
-        code_bytes = bytes(code, 'utf8')
-        results = []
-        
-        try:
-            captures = self._query_cast.captures(tree.root_node)
-            casts = captures.get('cast', [])
-            types = captures.get('type', [])
-            values = captures.get('value', [])
-            
-            for cast_node in casts:
-                result = {'start_byte': cast_node.start_byte, 'end_byte': cast_node.end_byte}
-                
-                for t_node in types:
-                    if cast_node.start_byte <= t_node.start_byte <= cast_node.end_byte:
-                        result['type'] = self._node_text(t_node, code_bytes)
-                        break
-                
-                for v_node in values:
-                    if cast_node.start_byte <= v_node.start_byte <= cast_node.end_byte:
-                        result['value'] = self._node_text(v_node, code_bytes)
-                        break
-                
-                if 'type' in result:
-                    results.append(result)
-        except:
-            pass
-        
-        return results
+        return self.find_expressions(code)['casts']
     
     def _count_args(self, args_node) -> int:
-        count = 0
-        for child in args_node.children:
-            if child.type not in ('(', ')', ','):
-                count += 1
-        return count
+        # 括号与逗号是匿名节点，参数（及夹在其间的注释）都是具名子节点
+        return args_node.named_child_count
     
     def _collect_errors(self, node, error_regions: List[Tuple[int, int]]):
-        if node.type == 'ERROR' or node.is_missing:
-            error_regions.append((node.start_byte, node.end_byte))
-        for child in node.children:
-            self._collect_errors(child, error_regions)
+        """收集 ERROR / MISSING 节点范围：无错误的树由 has_error 短路，否则交给原生 Query 查找"""
+        if not node.has_error:
+            return
+        for _, capture_dict in _query_matches(self._queries.error, node):
+            for err in capture_dict.get('err', []):
+                error_regions.append((err.start_byte, err.end_byte))
 
     def find_identifiers_in_errors(self, root, error_regions: List[Tuple[int, int]], code_bytes: bytes) -> List[dict]:
         """寻找错误区域中的标识符"""
@@ -613,17 +756,14 @@ class TreeSitterJavaParser:
         if not error_regions:
             return results
             
-        try:
-            captures = self._query_identifiers.captures(root)
-            for node in captures.get('id', []):
-                if self.is_in_error_region(node.start_byte, error_regions):
-                    results.append({
-                        'name': self._node_text(node, code_bytes),
-                        'start': node.start_byte,
-                        'end': node.end_byte
-                    })
-        except:
-            pass
+        for _, capture_dict in _query_matches(self._queries.identifiers, root):
+            node = capture_dict['id'][0]
+            if self.is_in_error_region(node.start_byte, error_regions):
+                results.append({
+                    'name': self._node_text(node, code_bytes),
+                    'start': node.start_byte,
+                    'end': node.end_byte
+                })
         return results
     
     def is_in_error_region(self, pos: int, regions: List[Tuple[int, int]]) -> bool:
@@ -632,65 +772,62 @@ class TreeSitterJavaParser:
     def find_method_declarations(self, code: str) -> List[dict]:
         """查找方法声明"""
         results = []
-        try:
-            tree = self.parse(code)
-            captures = self._query_method_decl.captures(tree.root_node)
-            code_bytes = bytes(code, 'utf8')
-            
-            methods = captures.get('method', [])
-            names = captures.get('name', [])
-            
-            for m_node in methods:
-                res = {'start_byte': m_node.start_byte, 'end_byte': m_node.end_byte}
-                for n_node in names:
-                    if m_node.start_byte <= n_node.start_byte <= m_node.end_byte:
-                        res['name'] = self._node_text(n_node, code_bytes)
-                        res['name_start'] = n_node.start_byte
-                        res['name_end'] = n_node.end_byte
-                        break
-                if 'name' in res:
-                    results.append(res)
-        except:
-            pass
+        tree, code_bytes = self.parse_with_bytes(code)
+        for _, capture_dict in _query_matches(self._queries.method_decl, tree.root_node):
+            m_node = capture_dict['method'][0]
+            n_node = capture_dict['name'][0]
+            results.append({
+                'start_byte': m_node.start_byte,
+                'end_byte': m_node.end_byte,
+                'name': self._node_text(n_node, code_bytes),
+                'name_start': n_node.start_byte,
+                'name_end': n_node.end_byte
+            })
         return results
 
     def find_field_declarations(self, code: str) -> List[dict]:
         """查找字段声明"""
         results = []
-        try:
-            tree = self.parse(code)
-            captures = self._query_field_decl.captures(tree.root_node)
-            code_bytes = bytes(code, 'utf8')
-            
-            fields = captures.get('field', [])
-            names = captures.get('name', [])
-            
-            for f_node in fields:
-                res = {'start_byte': f_node.start_byte, 'end_byte': f_node.end_byte}
-                for n_node in names:
-                    if f_node.start_byte <= n_node.start_byte <= f_node.end_byte:
-                        res['name'] = self._node_text(n_node, code_bytes)
-                        res['name_start'] = n_node.start_byte
-                        res['name_end'] = n_node.end_byte
-                        break
-                if 'name' in res:
-                    results.append(res)
-        except:
-            pass
+        tree, code_bytes = self.parse_with_bytes(code)
+        # 每个声明符一次匹配: "int a, b;" 产生两条结果
+        for _, capture_dict in _query_matches(self._queries.field_decl, tree.root_node):
+            f_node = capture_dict['field'][0]
+            n_node = capture_dict['name'][0]
+            results.append({
+                'start_byte': f_node.start_byte,
+                'end_byte': f_node.end_byte,
+                'name': self._node_text(n_node, code_bytes),
+                'name_start': n_node.start_byte,
+                'name_end': n_node.end_byte
+            })
         return results
 
 
 # ==================== 便捷函数 ====================
 
+# Tree-sitter Parser 不是线程安全的：便捷函数按线程复用各自的解析器实例
+_thread_local = threading.local()
+
+
+def _get_default_parser() -> TreeSitterJavaParser:
+    parser = getattr(_thread_local, 'parser', None)
+    if parser is None:
+        parser = _thread_local.parser = TreeSitterJavaParser()
+    return parser
+
+
 def parse_java_code(code: str):
-    return TreeSitterJavaParser().parse(code)
+    return _get_default_parser().parse(code)
 
 
 def extract_type_info(code: str) -> ClassTypeInfo:
-    return TreeSitterJavaParser().extract_type_info(code)
+    return _get_default_parser().extract_type_info(code)
 
 
 def count_errors(code: str) -> int:
-    info = TreeSitterJavaParser().extract_type_info(code)
-    return len(info.error_regions)
+    """统计 ERROR / MISSING 节点数量：只解析并执行错误查询，不构建 ClassTypeInfo"""
+    root = _get_default_parser().parse(code).root_node
+    if not root.has_error:
+        return 0
+    return len(_query_matches(_QUERIES.error, root))
 